@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import ResponseCache
+
+# Stand-in for api.realcommercial.com.au. Serves /listing-ui/searches and
+# /listing-ui/listings/{id} for a synthetic set of listings, built from
+# responses recorded in a responses.db when one is given, with injected
+# latency, 429s and 5xx errors.
+FIRST_ID = 500000000
+LISTING_PATTERN = re.compile(r"/listing-ui/listings/(\d+)")
+TRAILING_ID = re.compile(r"\d+$")
+
+# Used when no recorded responses are available
+BUILTIN_LISTING = {
+    "canonicalPath": "/for-sale/property-12-smith-street-ryde-nsw-2112-500000000",
+    "title": "Development Site with DA Approval",
+    "address": {"streetAddress": "12 Smith Street", "suburb": "Ryde", "suburbAddress": "Ryde, NSW 2112"},
+    "propertyTypes": ["Development Site & Land", "Retail"],
+    "availableChannels": ["buy"],
+    "price": {"forSale": {"display": "$1,250,000"}},
+    "daysActive": 12,
+    "attributes": [
+        {"id": "land-area", "value": "1,012 m²"},
+        {"id": "floor-area", "value": "450 m²"},
+        {"id": "zoning", "value": "MU1 Mixed Use"},
+        {"id": "tenure-type", "value": "Vacant Possession"},
+    ],
+    "agencies": [{"name": "Acme Commercial", "salespeople": [{"name": "Jo Citizen"}, {"name": "Sam Lee"}]}],
+    "description": "Corner site with DA approval for a mixed use development. " * 8,
+}
+
+
+def load_templates(path):
+    if not path:
+        return [BUILTIN_LISTING]
+    cache = ResponseCache(path)
+    templates = [p["listing"] for _, p in cache.iter_kind("listing") if p.get("listing", {}).get("canonicalPath")]
+    if not templates:
+        print(f"⚠️ No recorded listings in {path}, using the built-in fixture")
+        return [BUILTIN_LISTING]
+    print(f"📼 Replaying {len(templates)} recorded listings from {path}")
+    return templates
+
+
+class MockAPI:
+    def __init__(self, listings, templates, latency=0.0, p429=0.0, p5xx=0.0, retry_after=0, full_summaries=0.0):
+        self.ids = [str(FIRST_ID + i) for i in range(listings)]
+        self.templates = templates
+        self.latency = latency
+        self.p429 = p429
+        self.p5xx = p5xx
+        self.retry_after = retry_after
+        self.full_summaries = full_summaries
+        self.localities = {}
+
+    def listing(self, listing_id):
+        template = self.templates[int(listing_id) % len(self.templates)]
+        return dict(template, canonicalPath=TRAILING_ID.sub(listing_id, template["canonicalPath"]))
+
+    def summary(self, listing_id):
+        listing = self.listing(listing_id)
+        pdp_url = "https://www.realcommercial.com.au" + listing["canonicalPath"]
+        if random.random() < self.full_summaries:
+            return dict(listing, pdpUrl=pdp_url)
+        return {"pdpUrl": pdp_url, "title": listing.get("title"), "address": listing.get("address")}
+
+    def shard(self, localities):
+        # One locality gets every 17th listing plus the "surrounding suburbs"
+        # overlap shared by all shards; several localities get everything
+        if len(localities) != 1:
+            return self.ids
+        name = localities[0].get("locality")
+        if name not in self.localities:
+            k = len(self.localities) % 17
+            self.localities[name] = [lid for i, lid in enumerate(self.ids) if i % 17 == k or i % 50 == 0]
+        return self.localities[name]
+
+    def fault(self):
+        if self.latency:
+            time.sleep(random.expovariate(1 / self.latency))
+        roll = random.random()
+        if roll < self.p429:
+            return 429
+        if roll < self.p429 + self.p5xx:
+            return random.choice([500, 502, 503, 504])
+        return None
+
+
+def make_handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_fault(self, status):
+            headers = {"Retry-After": str(api.retry_after)} if status == 429 else None
+            self.send(status, {"error": "injected"}, headers)
+
+        def do_GET(self):
+            status = api.fault()
+            if status:
+                return self.send_fault(status)
+            match = LISTING_PATTERN.search(self.path)
+            if not match:
+                return self.send(404, {"error": "not found"})
+            self.send(200, {"listing": api.listing(match.group(1))})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            status = api.fault()
+            if status:
+                return self.send_fault(status)
+            if not self.path.startswith("/listing-ui/searches"):
+                return self.send(404, {"error": "not found"})
+            ids = api.shard(body.get("localities", []))
+            page, size = body.get("page", 1), body.get("page-size", 100)
+            chunk = ids[(page - 1) * size:page * size]
+            self.send(200, {"availableResults": len(ids), "listings": [api.summary(lid) for lid in chunk]})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock realcommercial.com.au listing API")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--listings", type=int, default=1000)
+    parser.add_argument("--fixtures", help="responses.db to replay recorded listings from")
+    parser.add_argument("--latency", type=float, default=0.02, help="mean added latency in seconds")
+    parser.add_argument("--p429", type=float, default=0.01, help="share of requests answered with 429")
+    parser.add_argument("--p5xx", type=float, default=0.01, help="share of requests answered with 5xx")
+    parser.add_argument("--retry-after", type=int, default=0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--full-summaries", type=float, default=0.0,
+                        help="share of search results carrying the complete listing")
+    args = parser.parse_args()
+
+    api = MockAPI(args.listings, load_templates(args.fixtures), args.latency, args.p429, args.p5xx,
+                  args.retry_after, args.full_summaries)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(api))
+    server.daemon_threads = True
+    print(f"🧪 Mock API with {args.listings} listings on http://127.0.0.1:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# End-to-end benchmark of the search and details stages against bench/mock_api.py.
+# Each stage runs in its own process inside a scratch directory, so the
+# module-level stores start empty and the peak RSS belongs to that stage alone.
+SIZES = [1000, 10000, 100000]
+# Fixed client-side request budget, high enough that the mock and the crawl
+# code set the pace rather than the limiter backing off after injected errors
+RATE = 200.0
+RESULT_FILE = "bench_result.json"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Mock API did not start on port {port}")
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_stage(stage, excel, workers):
+    # Runs inside the scratch directory; the stage modules open their stores on import
+    sys.path.insert(0, ROOT)
+    import http_client
+    import telemetry
+    from rate_limiter import AdaptiveRateLimiter
+
+    http_client.DEFAULT_RETRY.backoff_base = 0.05
+    limiter = AdaptiveRateLimiter(rate=RATE, min_rate=RATE, max_rate=RATE, burst=workers)
+    start = time.perf_counter()
+    if stage == "search":
+        import main_web_scrap as search
+        search.limiter = limiter
+        search.EXPORT_EXCEL = excel
+        search.SHARD_WORKERS = workers
+        search.run_search()
+        rows = len(search.all_data)
+    else:
+        import main_details as details
+        details.limiter = limiter
+        details.EXPORT_EXCEL = excel
+        details.WORKERS = workers
+        details.main()
+        rows = len(details.store)
+    elapsed = time.perf_counter() - start
+
+    totals = telemetry.totals()
+    result = {
+        "stage": stage,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_sec": rows / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "persist_seconds": totals.get("persist_seconds", 0.0) + totals.get("export_seconds", 0.0),
+        "requests": totals.get("http_responses_total", 0),
+        "retries": totals.get("http_retries_total", 0),
+    }
+    with open(RESULT_FILE, "w") as f:
+        json.dump(result, f)
+
+
+def bench_size(size, args):
+    port = free_port()
+    server_cmd = [sys.executable, os.path.join(HERE, "mock_api.py"), "--port", str(port), "--listings", str(size),
+                  "--latency", str(args.latency), "--p429", str(args.p429), "--p5xx", str(args.p5xx),
+                  "--full-summaries", str(args.full_summaries)]
+    if args.fixtures:
+        server_cmd += ["--fixtures", os.path.abspath(args.fixtures)]
+    workdir = tempfile.mkdtemp(prefix=f"bench_{size}_")
+    env = dict(os.environ, REALCOMMERCIAL_API=f"http://127.0.0.1:{port}")
+    results = []
+    server = subprocess.Popen(server_cmd, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        for stage in ("search", "details"):
+            stage_cmd = [sys.executable, os.path.abspath(__file__), "--stage", stage, "--workers", str(args.workers)]
+            if args.excel:
+                stage_cmd.append("--excel")
+            with open(os.path.join(workdir, f"{stage}.log"), "w") as log:
+                subprocess.run(stage_cmd, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+            with open(os.path.join(workdir, RESULT_FILE)) as f:
+                results.append(dict(json.load(f), size=size))
+    finally:
+        server.terminate()
+        server.wait()
+        if args.keep:
+            print(f"📁 Kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawl against a local mock API")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--p429", type=float, default=0.01)
+    parser.add_argument("--p5xx", type=float, default=0.01)
+    parser.add_argument("--full-summaries", type=float, default=0.0)
+    parser.add_argument("--fixtures", help="responses.db to replay recorded listings from")
+    parser.add_argument("--excel", action="store_true", help="also write the Excel workbooks")
+    parser.add_argument("--keep", action="store_true", help="keep each scratch directory and its logs")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--stage", choices=["search", "details"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        run_stage(args.stage, args.excel, args.workers)
+        return
+
+    results = []
+    print(f"{'size':>8} {'stage':<8} {'rows':>8} {'secs':>8} {'rows/s':>8} {'peak MB':>8} {'persist s':>9} {'retries':>8}")
+    for size in args.sizes:
+        for r in bench_size(size, args):
+            results.append(r)
+            print(f"{r['size']:>8} {r['stage']:<8} {r['rows']:>8} {r['seconds']:>8.1f} {r['rows_per_sec']:>8.1f} "
+                  f"{r['peak_rss_mb']:>8.0f} {r['persist_seconds']:>9.2f} {r['retries']:>8}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import time
+
+# Entry points for scheduled runs:
+#
+#   python cli.py search [--restart | --delta]
+#   python cli.py details [--refresh | --reparse]
+#   python cli.py export [--output FILE] [--no-excel]
+#   python cli.py status
+#   python cli.py query [--zoning B4 MU1] [--postcode 2000-2150] [--land-min 500] [--price-max 5m] ...
+#   python cli.py history LISTING_ID [--field "Asking Price" Status]
+#   python cli.py history --as-of 2026-03-31 --output snapshot.xlsx
+#
+# Only the sqlite-backed state is touched until there is real work, so a run
+# with nothing to do exits without loading pandas, pyarrow or openpyxl.
+
+
+def search(args):
+    import main_web_scrap
+    import telemetry
+
+    main_web_scrap.RESTART_CRAWL = args.restart
+    main_web_scrap.DELTA_CRAWL = args.delta
+    if main_web_scrap.up_to_date():
+        print("✅ Search already complete; use --restart or --delta to crawl again.")
+        return
+    main_web_scrap.run_search()
+    telemetry.report()
+
+
+def details(args):
+    import main_details
+
+    main_details.REFRESH = args.refresh
+    main_details.REPARSE_FROM_CACHE = args.reparse
+    if main_details.up_to_date():
+        print(f"✅ Nothing new in {main_details.INPUT_FILE} and no failed listings due.")
+        return
+    main_details.main()
+
+
+def export(args):
+    from listing_store import OUTPUT_FILE, ListingStore
+
+    output = args.output or OUTPUT_FILE
+    print(f"📄 Exported {ListingStore().export(output, excel=not args.no_excel)} listings to {output}")
+
+
+def status(args):
+    from crawl_state import CrawlState
+    from dead_letters import DeadLetterQueue
+    from history import ListingHistory
+    from listing_store import ListingIndex, ListingStore
+    from work_queue import WorkQueue
+
+    streams = CrawlState().streams()
+    completed = sum(1 for _, _, done, _ in streams if done)
+    print(f"Search streams: {completed}/{len(streams)} complete")
+    for stream, page, done, updated_at in streams:
+        if not done:
+            print(f"  {stream}: page {page}, last saved {updated_at}")
+    print(f"Listings seen by search: {len(ListingIndex())}")
+    print(f"Listings with details: {len(ListingStore())}")
+    print(f"Listings with history: {len(ListingHistory())}")
+    print(f"Dead letters: {DeadLetterQueue().counts()}")
+    queue = WorkQueue().counts()
+    if queue:
+        print(f"Work queue: {queue}")
+
+
+def query(args):
+    import query
+
+    query.run(args)
+
+
+def history(args):
+    import history
+
+    history.run(args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="realcommercial.com.au listing crawler")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("search", help="collect listing URLs from the search API")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--restart", action="store_true", help="forget pagination watermarks and start over")
+    mode.add_argument("--delta", action="store_true", help="only page until known listings show up")
+    p.set_defaults(func=search)
+
+    p = commands.add_parser("details", help="fetch details for collected listings")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--refresh", action="store_true", help="re-check listings that are already stored")
+    mode.add_argument("--reparse", action="store_true", help="rebuild rows from cached responses, offline")
+    p.set_defaults(func=details)
+
+    p = commands.add_parser("export", help="write the stored details to Parquet and Excel")
+    p.add_argument("--output", help="workbook path (default detailed_listings.xlsx)")
+    p.add_argument("--no-excel", action="store_true", help="only write the Parquet copy")
+    p.set_defaults(func=export)
+
+    p = commands.add_parser("status", help="show crawl progress")
+    p.set_defaults(func=status)
+
+    from query import add_arguments
+
+    p = commands.add_parser("query", help="filter collected listings by suburb, postcode, zoning, price or land size")
+    add_arguments(p)
+    p.set_defaults(func=query)
+
+    from history import add_arguments
+
+    p = commands.add_parser("history", help="show a listing's price and status timeline, or rebuild a past snapshot")
+    add_arguments(p)
+    p.set_defaults(func=history)
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    args.func(args)
+    print(f"⏱️ {args.command} finished in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from listing_store import STORE_FILE
+
+
+class CrawlState:
+    # Persisted pagination state for search streams (one stream per shard).
+    # crawl_pages logs every page fetched; crawl_streams holds the resume
+    # watermark: the last page fetched and the listing IDs it contained.
+    def __init__(self, path=STORE_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                stream            TEXT NOT NULL,
+                page              INTEGER NOT NULL,
+                listing_ids       TEXT NOT NULL,
+                available_results INTEGER,
+                fetched_at        TEXT NOT NULL,
+                PRIMARY KEY (stream, page)
+            );
+            CREATE TABLE IF NOT EXISTS crawl_streams (
+                stream            TEXT PRIMARY KEY,
+                page              INTEGER NOT NULL,
+                anchor_ids        TEXT NOT NULL,
+                available_results INTEGER,
+                completed         INTEGER NOT NULL DEFAULT 0,
+                updated_at        TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS crawl_values (
+                key        TEXT PRIMARY KEY,
+                value      TEXT,
+                updated_at TEXT NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def get(self, stream):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT page, anchor_ids, available_results, completed FROM crawl_streams WHERE stream = ?",
+                (stream,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "page": row[0],
+            "anchor_ids": json.loads(row[1]),
+            "available_results": row[2],
+            "completed": bool(row[3]),
+        }
+
+    def record_page(self, stream, page, listing_ids, available_results):
+        now = datetime.now().isoformat(timespec="seconds")
+        ids = json.dumps(listing_ids)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO crawl_pages VALUES (?, ?, ?, ?, ?)",
+                (stream, page, ids, available_results, now),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO crawl_streams VALUES (?, ?, ?, ?, 0, ?)",
+                (stream, page, ids, available_results, now),
+            )
+
+    def streams(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT stream, page, completed, updated_at FROM crawl_streams ORDER BY stream"
+            ).fetchall()
+
+    def get_value(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM crawl_values WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_value(self, key, value):
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO crawl_values VALUES (?, ?, ?)", (key, value, now))
+
+    def finish(self, stream):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE crawl_streams SET completed = 1 WHERE stream = ?", (stream,))
+
+    def reset(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM crawl_pages")
+            self.conn.execute("DELETE FROM crawl_streams")
@@ -0,0 +1,135 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from listing_store import STORE_FILE
+
+# 404/410: the listing was taken down, asking again won't bring it back
+PERMANENT_STATUSES = {404, 410}
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 30
+RETRY_BACKOFF_MAX = 24 * 3600
+
+
+def classify(error):
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    return error.__class__.__name__, status_code, status_code in PERMANENT_STATUSES
+
+
+class DeadLetterQueue:
+    # Listing IDs whose detail fetch failed, with the error and attempt count.
+    # Transient failures become due again after an exponential backoff and are
+    # given up after MAX_ATTEMPTS; delisted (404/410) ones are never retried.
+    def __init__(self, path=STORE_FILE, max_attempts=MAX_ATTEMPTS, backoff=RETRY_BACKOFF,
+                 backoff_max=RETRY_BACKOFF_MAX):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                listing_id      TEXT PRIMARY KEY,
+                error_class     TEXT NOT NULL,
+                message         TEXT,
+                status_code     INTEGER,
+                attempts        INTEGER NOT NULL,
+                permanent       INTEGER NOT NULL DEFAULT 0,
+                first_failed_at TEXT NOT NULL,
+                last_failed_at  TEXT NOT NULL,
+                next_retry_at   REAL
+            )
+        """)
+        self.conn.commit()
+        # Most runs have no failures; spare every success a DELETE
+        self.queued = {r[0] for r in self.conn.execute("SELECT listing_id FROM dead_letters")}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.queued)
+
+    def __contains__(self, listing_id):
+        with self.lock:
+            return str(listing_id) in self.queued
+
+    def record(self, listing_id, error):
+        error_class, status_code, permanent = classify(error)
+        listing_id = str(listing_id)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT attempts FROM dead_letters WHERE listing_id = ?", (listing_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            if permanent or attempts >= self.max_attempts:
+                next_retry_at = None
+            else:
+                next_retry_at = time.time() + min(self.backoff_max, self.backoff * 2 ** (attempts - 1))
+            self.conn.execute(
+                """
+                INSERT INTO dead_letters VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(listing_id) DO UPDATE SET
+                    error_class = excluded.error_class, message = excluded.message,
+                    status_code = excluded.status_code, attempts = excluded.attempts,
+                    permanent = excluded.permanent, last_failed_at = excluded.last_failed_at,
+                    next_retry_at = excluded.next_retry_at
+                """,
+                (listing_id, error_class, str(error)[:500], status_code, attempts, int(permanent), now, now,
+                 next_retry_at),
+            )
+            self.queued.add(listing_id)
+        return attempts, permanent
+
+    def clear(self, listing_id):
+        listing_id = str(listing_id)
+        with self.lock:
+            # queued only knows this process's failures; another worker may have
+            # dead-lettered the ID, so check the table (a read) before giving up
+            if listing_id not in self.queued and not self.conn.execute(
+                "SELECT 1 FROM dead_letters WHERE listing_id = ?", (listing_id,)
+            ).fetchone():
+                return
+            with self.conn:
+                self.conn.execute("DELETE FROM dead_letters WHERE listing_id = ?", (listing_id,))
+            self.queued.discard(listing_id)
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT listing_id FROM dead_letters WHERE next_retry_at <= ? ORDER BY next_retry_at", (now,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def next_due(self):
+        # Seconds until the next retry becomes due, None if nothing is retryable
+        with self.lock:
+            row = self.conn.execute("SELECT MIN(next_retry_at) FROM dead_letters").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def counts(self):
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT COALESCE(SUM(permanent = 1), 0),
+                       COALESCE(SUM(permanent = 0 AND next_retry_at IS NULL), 0),
+                       COALESCE(SUM(next_retry_at IS NOT NULL), 0)
+                FROM dead_letters
+            """).fetchone()
+        return {"delisted": row[0], "gave_up": row[1], "retrying": row[2]}
+
+    def failures(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT listing_id, error_class, status_code, attempts, permanent, last_failed_at "
+                "FROM dead_letters ORDER BY last_failed_at"
+            ).fetchall()
+
+
+if __name__ == "__main__":
+    # python dead_letters.py: list failed listings
+    queue = DeadLetterQueue()
+    for listing_id, error_class, status_code, attempts, permanent, last_failed_at in queue.failures():
+        state = "delisted" if permanent else f"{attempts} attempt(s)"
+        print(f"{listing_id}  {error_class} {status_code or ''}  {state}  last {last_failed_at}")
+    print(queue.counts())
@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+import main_details as details
+import telemetry
+from work_queue import LEASE_SECONDS, WorkQueue
+
+# Distributed detail stage: IDs from the search output are loaded into the
+# work_queue table in listings.db, then PROCESSES worker processes claim
+# up to CLAIM_SIZE IDs at a time and fetch them with main_details. Each process
+# has its own rate limiter, so one host sends up to PROCESSES times the
+# single-process request rate.
+#
+#   python distributed.py           fill the queue and run PROCESSES workers
+#   python distributed.py worker    join a queue filled elsewhere
+#
+# Extra hosts can join by running the worker over the same directory, but
+# only if the shared filesystem gives SQLite working file locks (NFS often
+# doesn't).
+PROCESSES = 4
+CLAIM_SIZE = 100
+
+
+def fill_queue(queue):
+    counts = queue.counts()
+    if not counts.get("pending") and not counts.get("leased"):
+        # Last run finished: start over rather than treating its IDs as done
+        queue.clear()
+    df_input = details.load_input()
+    items = []
+    for _, row in df_input.iterrows():
+        listing_id = str(row["Listing ID"])
+        if listing_id in details.processed_ids and not details.REFRESH:
+            continue
+        if listing_id in details.dead_letters:
+            continue
+        items.append((listing_id, row.drop(labels=["Listing URL","Listing ID"]).to_dict()))
+    added = queue.enqueue(items)
+    print(f"📋 Queued {added} new of {len(items)} pending listings: {queue.counts()}")
+
+
+def claim_size():
+    # About half a lease's worth of requests at the current rate, so a
+    # throttled worker doesn't hold more than it can finish in time
+    return max(1, min(CLAIM_SIZE, int(details.limiter.rate * LEASE_SECONDS / 2)))
+
+
+def worker():
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    details.prepare_store()
+    queue = WorkQueue(details.STORE_FILE)
+    renewed = time.monotonic()
+
+    def renew(listing_id):
+        # Keep the lease alive while items complete, at most every third of it
+        nonlocal renewed
+        if time.monotonic() - renewed > LEASE_SECONDS / 3:
+            queue.renew(owner, LEASE_SECONDS)
+            renewed = time.monotonic()
+
+    done = 0
+    while True:
+        claimed = queue.claim(owner, claim_size(), LEASE_SECONDS)
+        renewed = time.monotonic()
+        if not claimed:
+            break
+        pending = [(done + i, extra, listing_id) for i, (listing_id, extra) in enumerate(claimed)]
+        # fetch_all flushes its batch before returning, so everything claimed
+        # is stored (or dead-lettered) by the time it is acked
+        details.fetch_all(pending, done + len(claimed), on_done=renew)
+        queue.ack(owner, [listing_id for listing_id, _ in claimed])
+        done += len(claimed)
+    print(f"🏁 Worker {owner} finished {done} listings")
+    telemetry.report(f"metrics-{os.getpid()}.prom")
+
+
+def run():
+    details.prepare_store()
+    queue = WorkQueue(details.STORE_FILE)
+    fill_queue(queue)
+    # spawn, not fork: each worker opens its own SQLite connections
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=worker) for _ in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    print(f"📋 Queue: {queue.counts()}")
+
+    details.prepare_store()
+    details.retry_dead_letters()
+    details.export()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["worker"]:
+        worker()
+    else:
+        run()
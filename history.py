@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+from listing_store import DETAIL_COLUMNS, STORE_FILE, normalize_value
+
+# Status recorded for a listing whose detail page started answering 404/410
+DELISTED = "Delisted"
+
+
+class ListingHistory:
+    # Field-level change log for detailed listings. A crawl stores a value only
+    # when it differs from the listing's latest recorded one (the first sighting
+    # stores every field), so unchanged listings cost nothing per crawl.
+    # Keyed (listing_id, field, crawled_at) for as-of lookups by primary key.
+    def __init__(self, path=STORE_FILE, fields=DETAIL_COLUMNS):
+        self.fields = fields
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_history (
+                listing_id TEXT NOT NULL,
+                field      TEXT NOT NULL,
+                crawled_at TEXT NOT NULL,
+                value      TEXT NOT NULL,
+                PRIMARY KEY (listing_id, field, crawled_at)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+        self.known = {r[0] for r in self.conn.execute("SELECT DISTINCT listing_id FROM listing_history")}
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(DISTINCT listing_id) FROM listing_history").fetchone()[0]
+
+    def __contains__(self, listing_id):
+        # known only grows, so a hit is final; a miss is checked against the
+        # table, where worker processes may have recorded the listing since
+        listing_id = str(listing_id)
+        with self.lock:
+            if listing_id in self.known:
+                return True
+            if self.conn.execute("SELECT 1 FROM listing_history WHERE listing_id = ? LIMIT 1", (listing_id,)).fetchone():
+                self.known.add(listing_id)
+                return True
+        return False
+
+    def latest(self, listing_id, as_of=None):
+        as_of = as_of or "9999"
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT field, value, MAX(crawled_at) FROM listing_history
+                WHERE listing_id = ? AND crawled_at <= ? GROUP BY field
+                """,
+                (str(listing_id), as_of),
+            ).fetchall()
+        return {field: value for field, value, _ in rows}
+
+    def record(self, listing_id, row, crawled_at=None):
+        # Only the fields present in row are compared; returns the changed ones
+        listing_id = str(listing_id)
+        crawled_at = crawled_at or datetime.now().isoformat(timespec="seconds")
+        current = self.latest(listing_id) if listing_id in self else {}
+        changes = {}
+        for field in self.fields:
+            if field in row:
+                value = normalize_value(row[field])
+                if current.get(field) != value:
+                    changes[field] = value
+        if changes:
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO listing_history VALUES (?, ?, ?, ?)",
+                    [(listing_id, field, crawled_at, value) for field, value in changes.items()],
+                )
+                self.known.add(listing_id)
+        return changes
+
+    def seed(self, items):
+        # Baselines for listings stored before history was kept: (listing_id, updated_at, row)
+        count = 0
+        for listing_id, updated_at, row in items:
+            if listing_id not in self:
+                self.record(listing_id, row, updated_at)
+                count += 1
+        return count
+
+    def as_of(self, when):
+        # {listing_id: row} as the crawl last saw each listing on or before `when`
+        when = str(when)
+        if len(when) == 10:
+            when += "T23:59:59"
+        with self.lock:
+            # One pass in key order; with MAX() SQLite takes value from the latest row
+            rows = self.conn.execute(
+                """
+                SELECT listing_id, field, value, MAX(crawled_at) FROM listing_history
+                WHERE crawled_at <= ? GROUP BY listing_id, field
+                """,
+                (when,),
+            ).fetchall()
+        snapshot = {}
+        for listing_id, field, value, _ in rows:
+            snapshot.setdefault(listing_id, {"Listing ID": listing_id})[field] = value
+        return snapshot
+
+    def timeline(self, listing_id, fields=None):
+        # [(crawled_at, field, old, new)] oldest first; the first sighting has old None
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT crawled_at, field, value FROM listing_history WHERE listing_id = ? ORDER BY crawled_at, field",
+                (str(listing_id),),
+            ).fetchall()
+        last = {}
+        events = []
+        for crawled_at, field, value in rows:
+            if fields is None or field in fields:
+                events.append((crawled_at, field, last.get(field), value))
+            last[field] = value
+        return events
+
+
+def add_arguments(parser):
+    parser.add_argument("listing_id", nargs="?", help="show this listing's timeline")
+    parser.add_argument("--field", nargs="+", dest="fields", help='e.g. "Asking Price" Status')
+    parser.add_argument("--as-of", help="rebuild every listing as of a date, e.g. 2026-03-31")
+    parser.add_argument("--output", help="write the as-of snapshot to a .csv or .xlsx file")
+    parser.add_argument("--store", default=STORE_FILE)
+
+
+def run(args):
+    history = ListingHistory(args.store)
+    if args.as_of:
+        snapshot = history.as_of(args.as_of)
+        if not args.output:
+            print(f"🕰️ {len(snapshot)} listings known as of {args.as_of}; use --output to write them")
+            return
+        import pandas as pd
+
+        df = pd.DataFrame(list(snapshot.values()), columns=["Listing ID", *history.fields])
+        if args.output.endswith(".csv"):
+            df.to_csv(args.output, index=False)
+        else:
+            df.to_excel(args.output, index=False)
+        print(f"📄 Wrote {len(df)} listings as of {args.as_of} to {args.output}")
+        return
+    if not args.listing_id:
+        raise SystemExit("Give a listing ID or --as-of DATE")
+
+    events = history.timeline(args.listing_id, args.fields)
+    for crawled_at, field, old, new in events:
+        if old is None:
+            print(f"{crawled_at} | {field}: {new}")
+        else:
+            print(f"{crawled_at} | {field}: {old} → {new}")
+    print(f"🕰️ {len(events)} recorded values for {args.listing_id}")
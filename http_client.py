@@ -0,0 +1,124 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import telemetry
+
+# Point at a local mock server with REALCOMMERCIAL_API=http://127.0.0.1:8000
+API_BASE = os.environ.get("REALCOMMERCIAL_API", "https://api.realcommercial.com.au")
+# HTTP/2 multiplexing needs httpx[http2]; plain requests (HTTP/1.1 keep-alive) otherwise
+USE_HTTP2 = os.environ.get("REALCOMMERCIAL_HTTP2", "") == "1"
+POOL_SIZE = 16
+TIMEOUT = 10
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+if httpx is not None:
+    TRANSIENT_ERRORS += (httpx.TransportError,)
+
+
+def accept_encoding():
+    # urllib3 only decodes brotli when one of these is installed
+    for module in ("brotli", "brotlicffi"):
+        try:
+            __import__(module)
+            return "gzip, deflate, br"
+        except ImportError:
+            pass
+    return "gzip, deflate"
+
+
+class RetryPolicy:
+    # Exponential backoff with full jitter, capped; Retry-After wins when longer
+    def __init__(self, max_attempts=5, backoff_base=1.0, backoff_max=60.0):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def delay(self, attempt, retry_after=None):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            return delay
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            headers = {"Accept-Encoding": accept_encoding(), "Accept": "application/json"}
+            if USE_HTTP2 and httpx is not None:
+                limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+                _session = httpx.Client(http2=True, limits=limits, headers=headers)
+            else:
+                if USE_HTTP2:
+                    print("⚠️ httpx[http2] not installed, falling back to HTTP/1.1 keep-alive")
+                _session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                _session.mount("https://", adapter)
+                _session.mount("http://", adapter)
+                _session.headers.update(headers)
+        return _session
+
+
+def request(method, path, limiter=None, retry=DEFAULT_RETRY, timeout=TIMEOUT, **kwargs):
+    url = path if path.startswith("http") else API_BASE + path
+    session = get_session()
+    last_attempt = retry.max_attempts - 1
+
+    for attempt in range(retry.max_attempts):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            with telemetry.timed("http_request_seconds", method=method):
+                res = session.request(method, url, timeout=timeout, **kwargs)
+        except TRANSIENT_ERRORS as e:
+            telemetry.inc("http_responses_total", method=method, status=e.__class__.__name__)
+            if attempt == last_attempt:
+                raise
+            telemetry.inc("http_retries_total", method=method)
+            delay = retry.delay(attempt)
+            print(f"🔁 {method} {path} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        telemetry.inc("http_responses_total", method=method, status=res.status_code)
+        retry_after = res.headers.get("Retry-After")
+        if limiter is not None:
+            limiter.report(res.status_code, retry_after)
+        if res.status_code in RETRY_STATUSES and attempt < last_attempt:
+            telemetry.inc("http_retries_total", method=method)
+            delay = retry.delay(attempt, retry_after)
+            print(f"🔁 {method} {path} returned {res.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        # 304 answers a conditional request; httpx would raise on it like any non-2xx
+        if res.status_code != 304:
+            res.raise_for_status()
+        return res
+
+
+def get(path, **kwargs):
+    return request("GET", path, **kwargs)
+
+
+def post(path, **kwargs):
+    return request("POST", path, **kwargs)
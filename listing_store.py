@@ -0,0 +1,375 @@
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+from records import ListingBatch, ListingRecord, normalize_value
+
+STORE_FILE = "listings.db"
+OUTPUT_FILE = "detailed_listings.xlsx"
+
+# Typed copies of the display fields, kept in their own columns for filtering
+TYPED_COLUMNS = {
+    "suburb": "TEXT", "postcode": "INTEGER", "status": "TEXT", "zoning": "TEXT",
+    "price_min": "REAL", "price_max": "REAL", "land_size": "REAL", "floor_area": "REAL",
+}
+
+# Secondary indexes over the typed columns, for query.py
+TYPED_INDEXES = {
+    "listings_suburb": "suburb COLLATE NOCASE",
+    "listings_postcode": "postcode",
+    "listings_zoning": "zoning, postcode",
+    "listings_status": "status",
+    "listings_price": "price_max",
+    "listings_land_size": "land_size",
+}
+
+# Columns the details transform produces for every listing
+DETAIL_COLUMNS = [
+    "Listing URL","Street name","Suburb","Postcode","Property Types",
+    "Status","Asking Price","Land size","Floor area","Zoning",
+    "Tenure","Date Added","Agency","Agent name 1","Agent name 2","Title","Description"
+]
+
+
+def extract_listing_id(url):
+    match = re.search(r'(\d+)$', str(url))
+    return match.group(1) if match else None
+
+
+def normalize_id(value):
+    # Excel hands numeric IDs back as int/float and blanks as NaN
+    if value is None or value != value or value == "":
+        return None
+    if isinstance(value, float):
+        value = int(value)
+    return str(value).strip() or None
+
+
+def content_hash(row, fields):
+    # Stable across Excel round-trips (NaN vs "", 2127.0 vs "2127")
+    values = [normalize_value(row.get(f)) for f in fields]
+    return hashlib.sha1(json.dumps(values).encode("utf-8")).hexdigest()
+
+
+def typed_values(listing_id, row):
+    r = ListingRecord.from_row(listing_id, row)
+    return r.suburb, r.postcode, r.status, r.zoning, r.price_min, r.price_max, r.land_size, r.floor_area
+
+
+class ListingStore:
+    # Crash-safe checkpoint store for detailed listings, one row per Listing ID.
+    # Rows are upserted as they arrive; the Excel file is exported in one batch.
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS listings (
+                listing_id TEXT PRIMARY KEY,
+                data       TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self._add_columns({"content_hash": "TEXT", "etag": "TEXT", "last_modified": "TEXT", **TYPED_COLUMNS})
+        for name, columns in TYPED_INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON listings ({columns})")
+        # Full-text index over title and description, keyed by the listings rowid
+        # (stable across upserts). Some SQLite builds ship without FTS5.
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(title, description, tokenize='porter unicode61')"
+            )
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self.conn.commit()
+        self.backfill_typed()
+        self.backfill_text()
+
+    def _add_columns(self, columns):
+        existing = {r[1] for r in self.conn.execute("PRAGMA table_info(listings)")}
+        for name, kind in columns.items():
+            if name not in existing:
+                self.conn.execute(f"ALTER TABLE listings ADD COLUMN {name} {kind}")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def put(self, listing_id, row, content_hash=None, etag=None, last_modified=None):
+        self.conn.execute(
+            """
+            INSERT INTO listings (listing_id, data, updated_at, content_hash, etag, last_modified,
+                                  suburb, postcode, status, zoning, price_min, price_max, land_size, floor_area)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(listing_id) DO UPDATE SET
+                data = excluded.data, updated_at = excluded.updated_at,
+                content_hash = excluded.content_hash,
+                -- No validators given (reparse, cache hit): keep the stored ones
+                etag = COALESCE(excluded.etag, etag),
+                last_modified = COALESCE(excluded.last_modified, last_modified), suburb = excluded.suburb,
+                postcode = excluded.postcode, status = excluded.status, zoning = excluded.zoning,
+                price_min = excluded.price_min, price_max = excluded.price_max,
+                land_size = excluded.land_size, floor_area = excluded.floor_area
+            """,
+            (str(listing_id), json.dumps(row, default=str), datetime.now().isoformat(timespec="seconds"),
+             content_hash, etag, last_modified, *typed_values(listing_id, row)),
+        )
+        if self.has_fts:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO listings_fts (rowid, title, description) "
+                "SELECT rowid, ?, ? FROM listings WHERE listing_id = ?",
+                (normalize_value(row.get("Title")), normalize_value(row.get("Description")), str(listing_id)),
+            )
+        self.conn.commit()
+
+    def backfill_typed(self):
+        # Rows stored before the typed columns existed, or imported from Excel
+        query = "SELECT listing_id, data FROM listings WHERE suburb IS NULL"
+        updates = [(*typed_values(listing_id, json.loads(data)), listing_id)
+                   for listing_id, data in self.conn.execute(query)]
+        if updates:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE listings SET suburb = ?, postcode = ?, status = ?, zoning = ?, price_min = ?, "
+                    "price_max = ?, land_size = ?, floor_area = ? WHERE listing_id = ?",
+                    updates,
+                )
+
+    def backfill_text(self):
+        # Rows stored before the full-text index existed, or imported from Excel
+        if not self.has_fts:
+            return
+        query = "SELECT rowid, data FROM listings WHERE rowid NOT IN (SELECT rowid FROM listings_fts)"
+        missing = []
+        for rowid, data in self.conn.execute(query):
+            row = json.loads(data)
+            missing.append((rowid, normalize_value(row.get("Title")), normalize_value(row.get("Description"))))
+        if missing:
+            with self.conn:
+                self.conn.executemany("INSERT INTO listings_fts (rowid, title, description) VALUES (?, ?, ?)", missing)
+
+    def batch(self, where="1", params=()):
+        # Typed columns of the matching rows as a ListingBatch, without decoding any JSON
+        batch = ListingBatch()
+        query = f"""
+            SELECT listing_id, suburb, postcode, status, zoning, price_min, price_max, land_size, floor_area
+            FROM listings WHERE {where}
+        """
+        for row in self.conn.execute(query, params):
+            batch.append(ListingRecord(int(row[0]), *row[1:]))
+        return batch
+
+    def set_status(self, listing_id, status):
+        # Status only, e.g. a delisting; the hash is recomputed from data if the
+        # listing comes back
+        self.conn.execute(
+            "UPDATE listings SET data = json_set(data, '$.Status', ?), status = ?, content_hash = NULL, "
+            "updated_at = ? WHERE listing_id = ? AND status IS NOT ?",
+            (status, status, datetime.now().isoformat(timespec="seconds"), str(listing_id), status),
+        )
+        self.conn.commit()
+
+    def touch(self, listing_id, etag=None, last_modified=None):
+        # Unchanged on re-check: keep the row, refresh any new validators
+        self.conn.execute(
+            "UPDATE listings SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE listing_id = ?",
+            (etag, last_modified, str(listing_id)),
+        )
+        self.conn.commit()
+
+    def fingerprints(self, fields):
+        # {listing_id: {"hash", "etag", "last_modified"}}; rows checkpointed before
+        # hashes were stored get theirs computed from the saved data
+        result = {}
+        query = "SELECT listing_id, content_hash, etag, last_modified, CASE WHEN content_hash IS NULL THEN data END FROM listings"
+        for listing_id, digest, etag, last_modified, data in self.conn.execute(query):
+            if digest is None:
+                digest = content_hash(json.loads(data), fields)
+            result[listing_id] = {"hash": digest, "etag": etag, "last_modified": last_modified}
+        return result
+
+    def get(self, listing_id):
+        row = self.conn.execute("SELECT data FROM listings WHERE listing_id = ?", (str(listing_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids(self):
+        return {r[0] for r in self.conn.execute("SELECT listing_id FROM listings")}
+
+    def rows(self):
+        for (data,) in self.conn.execute("SELECT data FROM listings ORDER BY rowid"):
+            yield json.loads(data)
+
+    def items(self):
+        # (listing_id, updated_at, row)
+        for listing_id, updated_at, data in self.conn.execute(
+            "SELECT listing_id, updated_at, data FROM listings ORDER BY rowid"
+        ).fetchall():
+            yield listing_id, updated_at, json.loads(data)
+
+    def import_excel(self, path, id_func):
+        # One-off bootstrap from a workbook written by the old per-listing rewrite
+        import pandas as pd
+
+        df = pd.read_excel(path)
+        count = 0
+        with self.conn:
+            for row in df.to_dict(orient="records"):
+                listing_id = normalize_id(row.get("Listing ID")) or id_func(row.get("Listing URL"))
+                if not listing_id:
+                    continue
+                row.pop("Listing ID", None)
+                row = {"Listing ID": listing_id, **row}
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO listings (listing_id, data, updated_at) VALUES (?, ?, ?)",
+                    (listing_id, json.dumps(row, default=str), datetime.now().isoformat(timespec="seconds")),
+                )
+                count += 1
+        self.backfill_typed()
+        self.backfill_text()
+        return count
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(list(self.rows()))
+
+    def columns(self):
+        # Union of row keys in first-seen order; rows from the input file carry extra columns
+        columns = {}
+        for row in self.rows():
+            columns.update(dict.fromkeys(row))
+        return list(columns)
+
+    def export(self, path=OUTPUT_FILE, excel=True):
+        # Parquet next to the workbook; the .xlsx itself is optional. Rows are
+        # streamed from SQLite, so memory stays flat however many there are.
+        from tables import stream_table
+
+        return stream_table(self.rows(), self.columns(), path, excel=excel)
+
+    def close(self):
+        self.conn.close()
+
+
+class SummaryStore:
+    # Full listing objects from search results, latest copy per Listing ID.
+    # Written by the search threads and read by detail workers, so it keeps its
+    # own connection behind a lock.
+    def __init__(self, path=STORE_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_summaries (
+                listing_id TEXT PRIMARY KEY,
+                data       TEXT NOT NULL,
+                seen_at    TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def put_many(self, summaries):
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO search_summaries VALUES (?, ?, ?)",
+                [(listing_id, json.dumps(summary), now) for listing_id, summary in summaries],
+            )
+
+    def get(self, listing_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data FROM search_summaries WHERE listing_id = ?", (str(listing_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class ListingIndex:
+    # Canonical record of every listing ID (as parsed by extract_listing_id)
+    # the crawl has come across: where and when search saw it and when its
+    # details were last fetched. Shared by search threads and detail workers.
+    def __init__(self, path=STORE_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS listing_index (
+                listing_id  TEXT PRIMARY KEY,
+                listing_url TEXT,
+                localities  TEXT NOT NULL DEFAULT '[]',
+                first_seen  TEXT,
+                last_seen   TEXT,
+                fetched_at  TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM listing_index").fetchone()[0]
+
+    def record(self, listings, locality):
+        # listings: (listing_id, listing_url) pairs seen on one search page
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.conn:
+            for listing_id, listing_url in listings:
+                row = self.conn.execute(
+                    "SELECT localities FROM listing_index WHERE listing_id = ?", (listing_id,)
+                ).fetchone()
+                localities = json.loads(row[0]) if row else []
+                if locality not in localities:
+                    localities.append(locality)
+                self.conn.execute(
+                    """
+                    INSERT INTO listing_index (listing_id, listing_url, localities, first_seen, last_seen)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(listing_id) DO UPDATE SET
+                        listing_url = excluded.listing_url, localities = excluded.localities,
+                        first_seen = COALESCE(first_seen, excluded.first_seen), last_seen = excluded.last_seen
+                    """,
+                    (listing_id, listing_url, json.dumps(localities), now, now),
+                )
+
+    def mark_fetched(self, listing_id):
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO listing_index (listing_id, fetched_at) VALUES (?, ?)
+                ON CONFLICT(listing_id) DO UPDATE SET fetched_at = excluded.fetched_at
+                """,
+                (str(listing_id), now),
+            )
+
+    def fetched_since(self, since):
+        with self.lock:
+            rows = self.conn.execute("SELECT listing_id FROM listing_index WHERE fetched_at >= ?", (since,))
+            return {r[0] for r in rows}
+
+    def get(self, listing_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT listing_url, localities, first_seen, last_seen, fetched_at FROM listing_index WHERE listing_id = ?",
+                (str(listing_id),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "listing_url": row[0],
+            "localities": json.loads(row[1]),
+            "first_seen": row[2],
+            "last_seen": row[3],
+            "fetched_at": row[4],
+        }
+
+
+if __name__ == "__main__":
+    # On-demand export: python listing_store.py [output.xlsx]
+    out = sys.argv[1] if len(sys.argv) > 1 else OUTPUT_FILE
+    store = ListingStore()
+    print(f"✅ Exported {store.export(out)} listings to {out}")
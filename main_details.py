@@ -1,221 +1,347 @@
-import pandas as pd
-import requests
-import time
-import re
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import http_client
+import telemetry
+from dead_letters import DeadLetterQueue
+from history import DELISTED, ListingHistory
+from crawl_state import CrawlState
+from listing_store import DETAIL_COLUMNS, ListingIndex, ListingStore, SummaryStore, content_hash, extract_listing_id
+from rate_limiter import AdaptiveRateLimiter
+from response_cache import ResponseCache, cache_key
+from tables import parquet_path, read_table
 
 INPUT_FILE = "real_estate_listings.xlsx"
 OUTPUT_FILE = "detailed_listings.xlsx"
-
-ZONING_MAP = {
-    "Neighbourhood Centre": "B1",
-    "Local Centre": "B2",
-    "Commercial Core": "B3",
-    "Mixed Use": "B4",
-    "Business Development": "B5",
-    "Enterprise Corridor": "B6",
-    "Business Park": "B7",
-    "Metropolitan Centre": "B8",
-    "National Parks and Nature Reserves": "E1",
-    "Environmental Conservation": "E2",
-    "Environmental Management": "E3",
-    "Environmental Living": "E4",
-    "General Industrial": "IN1",
-    "Light Industrial": "IN2",
-    "Heavy Industrial": "IN3",
-    "Working Waterfront": "IN4",
-    "General Residential": "R1",
-    "Low Density Residential": "R2",
-    "Medium Density Residential": "R3",
-    "High Density Residential": "R4",
-    "Large Lot Residential": "R5",
-    "Public Recreation": "RE1",
-    "Private Recreation": "RE2",
-    "Primary Production": "RU1",
-    "Rural Landscape": "RU2",
-    "Forestry": "RU3",
-    "Primary Production Small Lots": "RU4",
-    "Village": "RU5",
-    "Transition": "RU6",
-    "Special Activities": "SP1",
-    "Infrastructure": "SP2",
-    "Tourist": "SP3",
-    "Natural Waterways": "W1",
-    "Recreational Waterways": "W2",
-    "Working Waterways": "W3"
-}
-
-def extract_zoning_shortcode(zoning_raw):
-    zoning_raw_lower = zoning_raw.lower()
-    for long_name, code in ZONING_MAP.items():
-        if long_name.lower() in zoning_raw_lower:
-            return code
-    # fallback regex if backend sends standard "MU1", "B2" etc
-    zoning_match = re.search(r"\b([A-Z]{1,3}\d{0,2})\b", zoning_raw)
-    return zoning_match.group(1) if zoning_match else zoning_raw
-
-
-
-
-# Load input
-df_input = pd.read_excel(INPUT_FILE)
-if 'Listing URL' not in df_input.columns:
-    raise Exception("Missing 'Listing URL' column in Excel file")
-
-def extract_listing_id(url):
-    match = re.search(r'(\d+)$', str(url))
-    return match.group(1) if match else None
-
-df_input['Listing ID'] = df_input['Listing URL'].apply(extract_listing_id)
-df_input = df_input[df_input['Listing ID'].notnull()].reset_index(drop=True)
-
-# Load existing output (if exists)
-if os.path.exists(OUTPUT_FILE):
-    df_output = pd.read_excel(OUTPUT_FILE)
-    processed_ids = set()
-    for url in df_input['Listing URL']:
-        lid = extract_listing_id(url)
-        if lid and lid in df_output.to_string():
-            processed_ids.add(lid)
-else:
-    df_output = pd.DataFrame()
-    processed_ids = set()
-
-# API call to fetch details
-def fetch_details(listing_id):
+STORE_FILE = "listings.db"
+# Parquet copies are always written; the Excel workbook is an optional extra
+EXPORT_EXCEL = True
+
+# Concurrent fetching: worker threads share one adaptive token bucket
+# instead of sleeping a fixed 5 seconds after every listing.
+WORKERS = 4
+limiter = AdaptiveRateLimiter(rate=0.5, min_rate=0.1, max_rate=4.0)
+
+# Refresh mode: re-check stored listings too. Conditional requests are sent
+# where we hold an ETag/Last-Modified; otherwise rows are only rewritten when
+# their content hash changed. Changed rows are also written to CHANGES_FILE.
+REFRESH = False
+CHANGES_FILE = "changed_listings.xlsx"
+# Rebuild every stored row from cached raw responses without touching the API
+REPARSE_FROM_CACHE = False
+# Title joined the columns later; leaving it out keeps older hashes valid
+HASH_FIELDS = [c for c in DETAIL_COLUMNS if c != "Title"]
+# Raw payloads are normalized this many at a time
+BATCH_SIZE = 100
+# A search result carrying all of these already has everything the transform
+# reads, so its /listings/{id} request is skipped
+SUMMARY_DETAIL_KEYS = [
+    "address", "propertyTypes", "availableChannels", "price", "daysActive",
+    "attributes", "agencies", "description", "title",
+]
+# ...and these attribute ids, which search results often leave out
+SUMMARY_ATTRIBUTE_IDS = ["zoning", "tenure-type"]
+NO_VALIDATORS = {"etag": None, "last_modified": None}
+# Failed fetches go to the dead-letter queue instead of being saved as blank
+# rows. At the end of a run the ones due again are retried in up to
+# RETRY_ROUNDS rounds, waiting at most RETRY_WAIT_MAX seconds for backoffs.
+RETRY_ROUNDS = 3
+RETRY_WAIT_MAX = 120
+
+# Checkpoint store; its primary key doubles as the exact resume index
+store = ListingStore(STORE_FILE)
+cache = ResponseCache()
+summaries = SummaryStore(STORE_FILE)
+dead_letters = DeadLetterQueue(STORE_FILE)
+# Shared with the search stage; fetched_at keeps an ID from being fetched
+# twice in one run, whichever path or process got to it first
+index = ListingIndex(STORE_FILE)
+crawl = CrawlState(STORE_FILE)
+# Field changes per listing, stamped with the run's start time
+history = ListingHistory(STORE_FILE)
+run_started = None
+processed_ids = set()
+fingerprints = {}
+changes = []
+# 404/410 answers seen by the fetch threads, settled by collect()
+delisted = set()
+
+def load_input():
+    df_input = read_table(INPUT_FILE)
+    if 'Listing URL' not in df_input.columns:
+        raise Exception("Missing 'Listing URL' column in Excel file")
+
+    df_input['Listing ID'] = df_input['Listing URL'].apply(extract_listing_id)
+    df_input = df_input[df_input['Listing ID'].notnull()]
+    repeats = df_input['Listing ID'].duplicated()
+    if repeats.any():
+        print(f"⏭️ Dropping {repeats.sum()} repeated listing IDs from {INPUT_FILE}")
+    return df_input[~repeats].reset_index(drop=True)
+
+def input_signature():
+    # Size and mtime of the input copies; search rewrites them whenever it finds listings
+    parts = []
+    for path in (INPUT_FILE, parquet_path(INPUT_FILE)):
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+def up_to_date():
+    # Cheap check for scheduled runs, before pandas is loaded: the input is
+    # unchanged since the last completed run and no failed listing is due
+    if REFRESH or REPARSE_FROM_CACHE:
+        return False
+    return crawl.get_value("details_input") == input_signature() and not dead_letters.due()
+
+def prepare_store():
+    global processed_ids, fingerprints, run_started
+    run_started = run_started or datetime.now().isoformat(timespec="seconds")
+    # Seeded once from an existing output workbook
+    if len(store) == 0 and os.path.exists(OUTPUT_FILE):
+        imported = store.import_excel(OUTPUT_FILE, extract_listing_id)
+        print(f"📥 Imported {imported} rows from {OUTPUT_FILE} into {STORE_FILE}")
+    processed_ids = store.ids()
+    if len(history) < len(processed_ids):
+        seeded = history.seed(store.items())
+        print(f"🕰️ History: recorded baselines for {seeded} stored listings")
+    fingerprints = store.fingerprints(HASH_FIELDS) if REFRESH else {}
+
+    evicted = cache.evict()
+    if evicted:
+        print(f"🧹 Cache: dropped {evicted} least recently used responses")
+
+# API call to fetch details; raw responses go through the on-disk cache.
+# Returns the raw listing payload, or None when the server answered 304.
+def fetch_details(listing_id, fingerprint=None):
     try:
-        url = f"https://api.realcommercial.com.au/listing-ui/listings/{listing_id}?channel=for-sale&featureFlags=showSoldDisclaimer,lsapiLocations"
-        res = requests.get(url, timeout=10)
-        res.raise_for_status()
-        d = res.json().get("listing", {})
-
-        addr = d.get("address", {})
-        agencies = d.get("agencies", [])
-        ag = agencies[0] if agencies else {}
-        sales = ag.get("salespeople", [])
-
-        title       = d.get("title", "")
-        description = d.get("description", "")
-        price_obj   = d.get("price", {}).get("forSale", {})
-        price       = price_obj.get("display", "")
-
-        # Get status: sold or on market
-        # status = "On Market" if d.get("status", "").lower() != "sold" else "Sold"
-        status = "Sold" if "sold" in [ch.lower() for ch in d.get("availableChannels", [])] else "On Market"
-        # asking_price = price if status == "On Market" else ""
-        if status == "On Market" and "$" in price:
-            asking_price = price
-        else:
-            asking_price = ""
-
-
-        # if status == "On Market" and price.strip().startswith("$"):
-        #     asking_price = price
-        # else:
-        #     asking_price = ""
-
-
-        days_active = d.get("daysActive", 0)
-        date_added = (datetime.now() - timedelta(days=days_active)).strftime("%Y-%m-%d")
-
-        attr = {a["id"]: a["value"] for a in d.get("attributes", [])}
-        land_size_raw = attr.get("land-area", "")
-        floor_area_raw = attr.get("floor-area", "")
-
-        # Remove m² and spaces
-        land_size = re.sub(r"[^\d.]", "", land_size_raw)
-        floor_area = re.sub(r"[^\d.]", "", floor_area_raw)
+        path = f"/listing-ui/listings/{listing_id}?channel=for-sale&featureFlags=showSoldDisclaimer,lsapiLocations"
+        key = cache_key("GET", path)
+        cached = None if REFRESH else cache.get(key)
+        if cached is not None:
+            return cached.get("listing", {}), NO_VALIDATORS
+
+        headers = {}
+        if fingerprint and fingerprint["etag"]:
+            headers["If-None-Match"] = fingerprint["etag"]
+        if fingerprint and fingerprint["last_modified"]:
+            headers["If-Modified-Since"] = fingerprint["last_modified"]
+        res = http_client.get(path, limiter=limiter, headers=headers)
+        validators = {"etag": res.headers.get("ETag"), "last_modified": res.headers.get("Last-Modified")}
+        if res.status_code == 304:
+            return None, validators
+        with telemetry.timed("json_decode_seconds", stage="details"):
+            payload = res.json()
+        cache.put(key, "listing", listing_id, payload)
+        return payload.get("listing", {}), validators
 
-        zoning_raw = attr.get("zoning", "")
-        zoning = extract_zoning_shortcode(zoning_raw)
-
-        # zoning_raw = attr.get("zoning", "")
-        # zoning_match = re.search(r"\b([A-Z]{1,3}\d{0,2})\b", zoning_raw)
-        # zoning = zoning_match.group(1) if zoning_match else zoning_raw
-
-
-
-        # zoning_raw = attr.get("zoning", "")
-        # # Extract zoning abbreviation from text, e.g., "Mixed Use – MU1" => "MU1"
-        # zoning_match = re.search(r"([A-Z]{1,3}\d+)", zoning_raw)
-        # zoning = zoning_match.group(1) if zoning_match else zoning_raw
-
-        tenure = attr.get("tenure-type", "")
-
-        suburb_address = addr.get("suburbAddress", "")
-        # Extract postcode as numbers only (e.g., 'NSW 2127' -> '2127')
-        if "," in suburb_address:
-            suburb_suffix = suburb_address.split(",")[-1].strip()
-            postcode_match = re.search(r"\b(\d{4})\b", suburb_suffix)
-            suburb_suffix = postcode_match.group(1) if postcode_match else ""
+    except Exception as e:
+        attempts, permanent = dead_letters.record(listing_id, e)
+        telemetry.inc("fetch_errors_total", stage="details", error=e.__class__.__name__)
+        if permanent:
+            delisted.add(listing_id)
+            print(f"🪦 Delisted {listing_id}: {e}")
         else:
-            suburb_suffix = ""
-        # suburb_suffix = suburb_address.split(",")[-1].strip() if "," in suburb_address else ""
-
-        return {
-            "Listing URL": "https://www.realcommercial.com.au" + d.get("canonicalPath", ""),
-            "Street name": addr.get("streetAddress", ""),
-            "Suburb": addr.get("suburb", ""),
-            "Postcode": suburb_suffix,
-            "Property Types": " • ".join(d.get("propertyTypes", [])),
-            "Status": status,
-            "Asking Price": asking_price,
-            # "Price": price,
-            "Land size": land_size,
-            "Floor area": floor_area,
-            "Zoning": zoning,
-            "Tenure": tenure,
-            "Date Added": date_added,
-            "Agency": ag.get("name", ""),
-
-            "Agent name 1": sales[0]["name"] if len(sales) > 0 else "",
-            "Agent name 2": sales[1]["name"] if len(sales) > 1 else "",
-
-            # "Agent name 1": (
-            #     f'{sales[0]["name"]}, {sales[0]["phone"]["display"]}'
-            #     if len(sales) > 0 and "phone" in sales[0] else (
-            #         sales[0]["name"] if len(sales) > 0 else ""
-            #     )
-            # ),
-            # "Agent name 2": (
-            #     f'{sales[1]["name"]}, {sales[1]["phone"]["display"]}'
-            #     if len(sales) > 1 and "phone" in sales[1] else (
-            #         sales[1]["name"] if len(sales) > 1 else ""
-            #     )
-            # ),
-            "Description": description
-        }
+            print(f"❌ Error fetching {listing_id} (attempt {attempts}): {e}")
+        return None, None
+
+def timed_fetch(listing_id, fingerprint=None):
+    # End-to-end time per listing, including limiter waits and retries
+    with telemetry.timed("fetch_seconds", stage="details"):
+        return fetch_details(listing_id, fingerprint)
+
+def from_summary(listing_id):
+    # The search-result object as a listing payload, if it is complete
+    summary = summaries.get(listing_id)
+    if not summary or not all(k in summary for k in SUMMARY_DETAIL_KEYS):
+        return None
+    attribute_ids = {a.get("id") for a in summary["attributes"] or [] if isinstance(a, dict)}
+    if not all(a in attribute_ids for a in SUMMARY_ATTRIBUTE_IDS):
+        return None
+    if "canonicalPath" not in summary and summary.get("pdpUrl"):
+        summary["canonicalPath"] = urlparse(summary["pdpUrl"]).path
+    return summary
+
+def normalize(listings):
+    # pandas is only loaded once there is something to transform
+    from transform import normalize_listings
+
+    with telemetry.timed("transform_seconds"):
+        return normalize_listings(listings)
+
+def reparse_from_cache():
+    count = 0
+    batch = []
+    for listing_id, payload in cache.iter_kind("listing"):
+        batch.append((listing_id, payload.get("listing", {})))
+        if len(batch) >= BATCH_SIZE:
+            count += reparse_batch(batch)
+            batch = []
+    count += reparse_batch(batch)
+    print(f"♻️ Reparsed {count} listings from the response cache")
+
+def reparse_batch(batch):
+    frame = normalize([raw for _, raw in batch])
+    for (listing_id, _), details in zip(batch, frame.to_dict(orient="records")):
+        previous = store.get(listing_id) or {"Listing ID": listing_id}
+        with telemetry.timed("persist_seconds", stage="details"):
+            store.put(listing_id, {**previous, **details}, content_hash=content_hash(details, HASH_FIELDS))
+    telemetry.inc("rows_saved_total", len(batch), stage="details")
+    return len(batch)
+
+def save_details(extra, listing_id, details, validators):
+    previous = fingerprints.get(listing_id)
+    digest = content_hash(details, HASH_FIELDS)
+    if previous and previous["hash"] == digest:
+        store.touch(listing_id, **validators)
+        telemetry.inc("rows_unchanged_total")
+        print(f"💤 Unchanged: {listing_id}")
+        return
+
+    combined = {"Listing ID": listing_id, **extra, **details}
 
-    except Exception as e:
-        print(f"❌ Error fetching {listing_id}: {e}")
-        return {k: "" for k in [
-            "Listing URL","Street name","Suburb","Postcode","Property Types",
-            "Status","Asking Price","Price","Land size","Floor area","Zoning",
-            "Tenure","Date Added","Agency","Agent name 1","Agent name 2","Description"
-        ]}
-
-# Loop and write after each
-for idx, row in df_input.iterrows():
-    listing_id = str(row["Listing ID"])
-    if listing_id in processed_ids:
-        print(f"⏭️ Skipping already processed ID {listing_id}")
-        continue
-
-    print(f"[{idx+1}/{len(df_input)}] Processing {listing_id}")
-    details = fetch_details(listing_id)
-    clean = row.drop(labels=["Listing URL","Listing ID"])
-    combined = {**clean.to_dict(), **details}
-
-    df_output = pd.concat([df_output, pd.DataFrame([combined])], ignore_index=True)
     try:
-        df_output.to_excel(OUTPUT_FILE, index=False)
+        with telemetry.timed("persist_seconds", stage="details"):
+            store.put(listing_id, combined, content_hash=digest, **(validators or {}))
+        telemetry.inc("rows_saved_total", stage="details")
+        changed = history.record(listing_id, details, run_started)
+        if previous and changed:
+            print(f"🕰️ {listing_id} changed: {', '.join(changed)}")
         print(f"✅ Saved: {listing_id}")
         processed_ids.add(listing_id)
+        if REFRESH:
+            changes.append({"Change": "Updated" if previous else "New", **combined})
     except Exception as write_err:
         print(f"⚠️ Failed to write after {listing_id}: {write_err}")
 
-    time.sleep(5)
+def flush(batch):
+    # Normalize a whole batch of raw payloads at once, then checkpoint each row
+    if not batch:
+        return
+    frame = normalize([raw for _, _, raw, _ in batch])
+    for (extra, listing_id, _, validators), details in zip(batch, frame.to_dict(orient="records")):
+        save_details(extra, listing_id, details, validators)
+    batch.clear()
+
+def collect(batch, extra, listing_id, raw, validators):
+    # Route one fetch result: failures and 304s are settled now, payloads
+    # wait in the batch until it is full
+    if validators is None:
+        # Failed and dead-lettered; only a delisting changes the stored row
+        if listing_id in delisted:
+            store.set_status(listing_id, DELISTED)
+            if listing_id in history:
+                history.record(listing_id, {"Status": DELISTED}, run_started)
+        elif listing_id in fingerprints:
+            print(f"⚠️ Keeping previous row for {listing_id}")
+        return
+    dead_letters.clear(listing_id)
+    index.mark_fetched(listing_id)
+    if raw is None:
+        print(f"💤 Not modified: {listing_id}")
+        return
+
+    batch.append((extra, listing_id, raw, validators))
+    if len(batch) >= BATCH_SIZE:
+        flush(batch)
+
+def fetch_all(pending, total, on_done=None):
+    # Fetch concurrently on worker threads; transform and checkpoint in
+    # batches on the main thread. on_done(listing_id) runs after each fetch
+    batch = []
+    to_fetch = []
+    fetched = index.fetched_since(run_started)
+    for idx, extra, listing_id in pending:
+        if listing_id in fetched:
+            print(f"[{idx+1}/{total}] Already fetched this run: {listing_id}")
+            continue
+        raw = None if REFRESH else from_summary(listing_id)
+        if raw is None:
+            to_fetch.append((idx, extra, listing_id))
+            continue
+        print(f"[{idx+1}/{total}] Complete in search results, no request needed: {listing_id}")
+        telemetry.inc("detail_requests_skipped_total")
+        collect(batch, extra, listing_id, raw, NO_VALIDATORS)
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        futures = {pool.submit(timed_fetch, listing_id, fingerprints.get(listing_id)): (idx, extra, listing_id)
+                   for idx, extra, listing_id in to_fetch}
+
+        for future in as_completed(futures):
+            idx, extra, listing_id = futures[future]
+            print(f"[{idx+1}/{total}] Processed {listing_id}")
+            collect(batch, extra, listing_id, *future.result())
+            if on_done:
+                on_done(listing_id)
+
+    flush(batch)
+
+def retry_dead_letters(extras=None):
+    # Retry pass over failures whose backoff has run out, waiting a little for
+    # ones about to become due; the rest are left for a later run
+    extras = extras or {}
+    for _ in range(RETRY_ROUNDS):
+        due = dead_letters.due()
+        if not due:
+            wait = dead_letters.next_due()
+            if wait is None or wait > RETRY_WAIT_MAX:
+                break
+            print(f"⏳ Waiting {wait:.0f}s to retry failed listings")
+            time.sleep(wait)
+            due = dead_letters.due()
+        print(f"🔁 Retrying {len(due)} failed listings")
+        fetch_all([(idx, extras.get(listing_id, {}), listing_id) for idx, listing_id in enumerate(due)], len(due))
+    counts = dead_letters.counts()
+    if any(counts.values()):
+        print(f"☠️ Dead letters: {counts['retrying']} to retry later, {counts['gave_up']} given up, "
+              f"{counts['delisted']} delisted")
+
+def export():
+    if REFRESH:
+        import pandas as pd
+
+        pd.DataFrame(changes).to_excel(CHANGES_FILE, index=False)
+        print(f"🔄 {len(changes)} changed listings written to {CHANGES_FILE}")
+
+    # Export the workbook once from the store
+    try:
+        with telemetry.timed("export_seconds", stage="details"):
+            exported = store.export(OUTPUT_FILE, excel=EXPORT_EXCEL)
+        print(f"📄 Exported {exported} listings to {OUTPUT_FILE}")
+    except Exception as write_err:
+        print(f"⚠️ Failed to export {OUTPUT_FILE}: {write_err}")
+
+def main():
+    prepare_store()
+    if REPARSE_FROM_CACHE:
+        reparse_from_cache()
+    else:
+        signature = input_signature()
+        df_input = load_input()
+        pending = []
+        extras = {}
+        for idx, row in df_input.iterrows():
+            listing_id = str(row["Listing ID"])
+            if listing_id in processed_ids and not REFRESH:
+                print(f"⏭️ Skipping already processed ID {listing_id}")
+                continue
+            extra = row.drop(labels=["Listing URL","Listing ID"]).to_dict()
+            if listing_id in dead_letters:
+                # Failed before: only retried once due, by retry_dead_letters
+                extras[listing_id] = extra
+                continue
+            pending.append((idx, extra, listing_id))
+        fetch_all(pending, len(df_input))
+        retry_dead_letters(extras)
+        crawl.set_value("details_input", signature)
+    export()
+    telemetry.report()
+
+if __name__ == "__main__":
+    main()
 
 
 
@@ -1,10 +1,16 @@
-import requests
-import time
-import random
-import pandas as pd
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-url = "https://api.realcommercial.com.au/listing-ui/searches?featureFlags=showSoldDisclaimer,lsapiLocations"
+import http_client
+import telemetry
+from crawl_state import CrawlState
+from listing_store import ListingIndex, SummaryStore, extract_listing_id
+from rate_limiter import AdaptiveRateLimiter
+from response_cache import ResponseCache, cache_key
+from tables import parquet_path, read_table, write_table
+
+search_path = "/listing-ui/searches?featureFlags=showSoldDisclaimer,lsapiLocations"
 
 payload = {
     "channel": "buy",
@@ -42,78 +48,206 @@ headers = {
 }
 
 output_file = "real_estate_listings.xlsx"
+# Pages are checkpointed to Parquet; the workbook is written once at the end
+EXPORT_EXCEL = True
+
+# Sharded mode: one paginated search per locality, run concurrently under a
+# single shared rate budget and merged/de-duplicated by listing ID.
+SHARDED = True
+SHARD_WORKERS = 4
+limiter = AdaptiveRateLimiter(rate=0.1, min_rate=0.05, max_rate=1.0)
+# Forget saved pagination watermarks and crawl every stream from page 1
+RESTART_CRAWL = False
+# Daily refresh: page from the top and stop at the first page whose listings
+# are all already known; pagination watermarks are left untouched. Always
+# one unsharded stream, so a quiet day costs a request or two, not one per locality.
+DELTA_CRAWL = False
 
-# Load previous data if exists
-if os.path.exists(output_file):
-    existing_df = pd.read_excel(output_file)
-    all_data = existing_df.to_dict(orient="records")
-    print(f"Loaded existing {len(all_data)} records from Excel.")
-    # Since first row is header, row count = total rows - 1
-    existing_count = len(existing_df)
-else:
-    all_data = []
-    existing_count = 0
-    print("No existing data found. Starting fresh.")
-
-# Calculate starting page based on how many listings are already collected
 page_size = payload["page-size"]
-start_page = (existing_count // page_size) + 1
-print(f"Resuming from page {start_page} (skipping {existing_count} listings already saved).")
-
-def save_to_excel(data):
-    df = pd.DataFrame(data)
-    df.to_excel(output_file, index=False)
 
-def fetch_data():
-    page = start_page
-    total_results = None
+# Resume from the pagination watermarks in crawl_state rather than row-count
+# arithmetic: newest-first sorting shifts every page as listings come and go.
+crawl = CrawlState()
+# Raw search pages are kept for offline reparsing; never served back, pages shift
+cache = ResponseCache()
+# Full search-result objects, so the details stage can skip complete listings
+summaries = SummaryStore()
+# One entry per listing ID across runs: first/last seen and source localities
+index = ListingIndex()
+
+all_data = []
+seen_ids = set()
+known_ids = frozenset()
+merge_lock = threading.Lock()
+
+def load_existing():
+    global all_data, seen_ids, known_ids
+    import pandas as pd
+
+    # Load previous data if exists
+    if os.path.exists(output_file) or os.path.exists(parquet_path(output_file)):
+        existing_df = read_table(output_file)
+        print(f"Loaded existing {len(existing_df)} records from Excel.")
+    else:
+        existing_df = pd.DataFrame(columns=["Listing URL"])
+        print("No existing data found. Starting fresh.")
+
+    # Older runs appended shifted pages as they came, repeats included;
+    # keep the first row per listing ID
+    ids = existing_df.get("Listing URL", pd.Series(None, index=existing_df.index, dtype=object)).map(extract_listing_id)
+    duplicated = ids.notnull() & ids.duplicated()
+    if duplicated.any():
+        print(f"Dropped {duplicated.sum()} repeated listings.")
+    all_data = existing_df[~duplicated].to_dict(orient="records")
+
+    seen_ids = {extract_listing_id(r.get("Listing URL")) for r in all_data} - {None}
+    # Snapshot before this run, so IDs merged by one shard don't end another early
+    known_ids = frozenset(seen_ids)
+
+def save_listings(data, excel=False):
+    import pandas as pd
+
+    with telemetry.timed("persist_seconds", stage="search"):
+        df = pd.DataFrame(data)
+        write_table(df, output_file, excel=excel)
+
+def search_page(name, stream_payload, page):
+    stream_payload["page"] = page
+    # Transient errors and 429/5xx are retried with jittered backoff inside http_client
+    with telemetry.timed("fetch_seconds", stage="search"):
+        response = http_client.post(search_path, json=stream_payload, headers=headers, limiter=limiter)
+    with telemetry.timed("json_decode_seconds", stage="search"):
+        data = response.json()
+    cache.put(cache_key("POST", search_path, stream_payload), "search", f"{name}:{page}", data)
+    return data
+
+def page_ids(data):
+    return [extract_listing_id(l.get("pdpUrl", "")) for l in data.get("listings", [])]
+
+def anchor_index(ids, anchors):
+    hits = [i for i, lid in enumerate(ids) if lid in anchors]
+    return hits[-1] if hits else None
+
+def paginate(name, stream_payload, delta=False):
+    # Yields (page, listings) for one search stream. On resume the IDs of the
+    # last recorded page act as anchors: the page is re-fetched once and only
+    # the listings after the last anchor still present are yielded.
+    state = None if delta else crawl.get(name)
+    if state and state["completed"]:
+        print(f"[{name}] Already complete; set RESTART_CRAWL to start a new crawl.")
+        return
+
+    page = state["page"] if state else 1
+    anchors = set(state["anchor_ids"]) if state else set()
+    data = search_page(name, stream_payload, page)
+    if state:
+        print(f"[{name}] Resuming at page {page} after listing {state['anchor_ids'][-1]}.")
+        shrank = data.get("availableResults", 0) < (state["available_results"] or 0)
+        if page > 1 and shrank and anchor_index(page_ids(data), anchors) is None:
+            # Listings removed above the watermark moved it up a page
+            page -= 1
+            data = search_page(name, stream_payload, page)
+
+    total_results = data.get("availableResults", 0)
+    print(f"[{name}] Total Results Found: {total_results}")
 
     while True:
-        try:
-            payload["page"] = page
-            response = requests.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-
-            data = response.json()
-
-            if total_results is None:
-                total_results = data.get("availableResults", 0)
-                print(f"Total Results Found: {total_results}")
-
-            listings = data.get("listings", [])
-            if not listings:
-                print("No more listings found. Exiting.")
-                break
-
-            page_data = []
-            for listing in listings:
-                pdp_url = listing.get("pdpUrl", "")
-                page_data.append({
-                    "Listing URL": pdp_url
-                })
-
-            all_data.extend(page_data)
-            save_to_excel(all_data)
-            print(f"Saved page {page} with {len(listings)} listings to Excel.")
-
-            page += 1
-            if (page - 1) * page_size >= total_results:
-                print("All listings scraped.")
-                break
-
-            delay = random.randint(10, 15)
-            print(f"Waiting {delay} seconds before fetching next page...")
-            time.sleep(delay)
-
-        except Exception as e:
-            print(f"Error on page {page}: {e}")
-            print("Sleeping 30 seconds before retrying...")
-            time.sleep(30)
-            # Do not increment page on error to retry
-            continue
-
-fetch_data()
-print(f"Scraping complete. Total listings saved: {len(all_data)}")
+        listings = data.get("listings", [])
+        if not listings:
+            break
+
+        ids = page_ids(data)
+        if anchors:
+            i = anchor_index(ids, anchors)
+            if i is not None:
+                listings = listings[i + 1:]
+                anchors = set()
+
+        yield page, listings
+        if delta:
+            if all(lid in known_ids for lid in ids):
+                print(f"[{name}] Page {page} is all known listings, delta crawl done.")
+                return
+        else:
+            # Only recorded once the caller has saved the page
+            crawl.record_page(name, page, ids, total_results)
+
+        page += 1
+        if (page - 1) * page_size >= total_results:
+            break
+        data = search_page(name, stream_payload, page)
+
+    if not delta:
+        crawl.finish(name)
+
+def merge_page(listings, source):
+    # Called from shard workers; keeps the first copy of each listing ID and
+    # returns the IDs that were new
+    ids = [extract_listing_id(l.get("pdpUrl", "")) for l in listings]
+    summaries.put_many((listing_id, listing) for listing_id, listing in zip(ids, listings) if listing_id)
+    index.record([(listing_id, l.get("pdpUrl")) for listing_id, l in zip(ids, listings) if listing_id], source)
+    with merge_lock:
+        added = []
+        for listing_id, listing in zip(ids, listings):
+            pdp_url = listing.get("pdpUrl", "")
+            if not listing_id or listing_id in seen_ids:
+                continue
+            seen_ids.add(listing_id)
+            all_data.append({"Listing URL": pdp_url})
+            added.append(listing_id)
+        if added:
+            telemetry.inc("rows_saved_total", len(added), stage="search")
+            save_listings(all_data)
+        return added
+
+def crawl_stream(name, stream_payload, on_new_ids=None):
+    try:
+        for page, listings in paginate(name, stream_payload, delta=DELTA_CRAWL):
+            added = merge_page(listings, name)
+            print(f"[{name}] Saved page {page}: {len(added)} new of {len(listings)} listings.")
+            if on_new_ids and added:
+                on_new_ids(added)
+    except Exception as e:
+        print(f"[{name}] Error: {e}")
+        print(f"[{name}] Giving up after retries; progress is saved, re-run to resume.")
+
+def fetch_data(on_new_ids=None):
+    crawl_stream("all", payload, on_new_ids)
+
+def stream_name(locality):
+    return locality.get("postcode") or locality["locality"]
+
+def fetch_shard(locality, on_new_ids=None):
+    crawl_stream(stream_name(locality), {**payload, "localities": [locality]}, on_new_ids)
+
+def fetch_sharded(on_new_ids=None):
+    with ThreadPoolExecutor(max_workers=SHARD_WORKERS) as pool:
+        list(pool.map(lambda locality: fetch_shard(locality, on_new_ids), payload["localities"]))
+
+def up_to_date():
+    # Every stream already paged to the end: a resume would only re-save the file
+    if RESTART_CRAWL or DELTA_CRAWL:
+        return False
+    names = [stream_name(l) for l in payload["localities"]] if SHARDED else ["all"]
+    return all((crawl.get(name) or {}).get("completed") for name in names)
+
+def run_search(on_new_ids=None):
+    load_existing()
+    if on_new_ids and seen_ids:
+        # Hand over listings collected by earlier runs first
+        on_new_ids([lid for lid in map(extract_listing_id, (r.get("Listing URL") for r in all_data)) if lid])
+    if RESTART_CRAWL:
+        crawl.reset()
+    if SHARDED and not DELTA_CRAWL:
+        fetch_sharded(on_new_ids)
+    else:
+        fetch_data(on_new_ids)
+    save_listings(all_data, excel=EXPORT_EXCEL)
+    print(f"Scraping complete. Total listings saved: {len(all_data)}")
+
+if __name__ == "__main__":
+    run_search()
+    telemetry.report()
 
 
 
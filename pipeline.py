@@ -0,0 +1,88 @@
+import queue
+import threading
+
+import main_details as details
+import main_web_scrap as search
+import telemetry
+
+# Bounded hand-off between the search stage and the detail workers. When the
+# workers fall behind, search threads block on put() instead of piling up IDs.
+QUEUE_SIZE = 200
+DONE = None
+
+
+def run():
+    details.prepare_store()
+    ids = queue.Queue(maxsize=QUEUE_SIZE)
+    results = queue.Queue(maxsize=QUEUE_SIZE)
+    queued = set()
+    queued_lock = threading.Lock()
+
+    def enqueue(listing_ids):
+        for listing_id in listing_ids:
+            with queued_lock:
+                done = listing_id in details.processed_ids and not details.REFRESH
+                if done or listing_id in queued or listing_id in details.dead_letters:
+                    continue
+                queued.add(listing_id)
+            ids.put(listing_id)
+
+    def produce():
+        try:
+            search.run_search(on_new_ids=enqueue)
+        finally:
+            for _ in range(details.WORKERS):
+                ids.put(DONE)
+
+    def work():
+        # Always signal DONE, or the loop below would wait on this worker forever
+        try:
+            while True:
+                listing_id = ids.get()
+                if listing_id is DONE:
+                    return
+                try:
+                    raw = None if details.REFRESH else details.from_summary(listing_id)
+                    if raw is not None:
+                        validators = details.NO_VALIDATORS
+                    else:
+                        raw, validators = details.timed_fetch(listing_id, details.fingerprints.get(listing_id))
+                except Exception as e:
+                    # e.g. the store stayed locked past its timeout; not saved,
+                    # so the next details run picks the ID up again
+                    print(f"❌ Worker failed on {listing_id}: {e}")
+                    continue
+                results.put((listing_id, raw, validators))
+        finally:
+            results.put(DONE)
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=work, daemon=True) for _ in range(details.WORKERS)]
+    for thread in threads:
+        thread.start()
+
+    # Transform and checkpoint on this thread, as in main_details
+    batch = []
+    finished = 0
+    processed = 0
+    while finished < details.WORKERS:
+        item = results.get()
+        if item is DONE:
+            finished += 1
+            continue
+        listing_id, raw, validators = item
+        processed += 1
+        print(f"[{processed}/{len(queued)}] Processed {listing_id}")
+        details.collect(batch, {}, listing_id, raw, validators)
+        # Don't hold rows back waiting for a full batch while the workers are idle
+        if results.empty():
+            details.flush(batch)
+
+    details.flush(batch)
+    details.retry_dead_letters()
+    details.export()
+    telemetry.report()
+
+
+if __name__ == "__main__":
+    run()
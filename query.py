@@ -0,0 +1,178 @@
+import json
+
+from listing_store import STORE_FILE, ListingStore
+from records import parse_price
+
+# Filters over the typed listing columns, answered from SQLite's secondary
+# indexes (listing_store.TYPED_INDEXES) rather than by loading a workbook:
+#
+#   python cli.py query --zoning B4 MU1 --postcode 2000-2150 --land-min 500 --price-max 5m
+#   python cli.py query --phrase "DA approved" "development site" --status "On Market"
+#   python cli.py query --zoning B4 MU1 --stats suburb
+#
+# Text matches come from the FTS5 index over title and description and are
+# listed best match first.
+# Listings without a parsed value never match a filter on that value.
+# --stats groups the matches on these typed columns, vectorized over a ListingBatch
+STATS_BY = ["suburb", "zoning", "status", "postcode"]
+COLUMNS = ["Listing ID", "Suburb", "Postcode", "Zoning", "Status", "Asking Price", "Land size", "Title", "Listing URL"]
+
+
+def parse_amount(text):
+    # "5m", "$850k", "1,200,000"
+    low, _ = parse_price("$" + str(text).lstrip("$"))
+    if low is None:
+        raise ValueError(f"Not an amount: {text}")
+    return low
+
+
+def parse_range(text):
+    # "2000-2150", "2000-" or "2150"
+    low, sep, high = str(text).partition("-")
+    if not sep:
+        return int(low), int(low)
+    return (int(low) if low else None), (int(high) if high else None)
+
+
+def build_where(suburbs=None, postcodes=None, zoning=None, status=None, price_min=None, price_max=None,
+                land_min=None, land_max=None):
+    clauses, params = [], []
+
+    def any_of(column, values, collate=""):
+        clauses.append(f"{column}{collate} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+    if suburbs:
+        any_of("suburb", suburbs, " COLLATE NOCASE")
+    if zoning:
+        any_of("zoning", [z.upper() for z in zoning])
+    if status:
+        any_of("status", status)
+    for column, op, value in [
+        ("postcode", ">=", postcodes and postcodes[0]), ("postcode", "<=", postcodes and postcodes[1]),
+        ("price_min", ">=", price_min), ("price_max", "<=", price_max),
+        ("land_size", ">=", land_min), ("land_size", "<=", land_max),
+    ]:
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    return " AND ".join(clauses) or "1", params
+
+
+def refresh_stats(store):
+    # Without statistics SQLite may pick a barely selective index (status) over
+    # a narrow range one; ANALYZE once, then PRAGMA optimize keeps them current
+    has_stats = store.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    store.conn.execute("PRAGMA optimize" if has_stats else "ANALYZE")
+
+
+def phrase_query(phrases):
+    # Any of the phrases, each matched as a whole ("DA approved", not DA AND approved)
+    return " OR ".join('"' + p.replace('"', '""') + '"' for p in phrases)
+
+
+def search(store, limit=None, order="price_max", match=None, **filters):
+    where, params = build_where(**filters)
+    if match:
+        # Ranked by bm25, title hits weighing double
+        query = f"""
+            SELECT data FROM listings_fts JOIN listings ON listings.rowid = listings_fts.rowid
+            WHERE listings_fts MATCH ? AND {where} ORDER BY bm25(listings_fts, 2.0, 1.0)
+        """
+        params = [match, *params]
+    else:
+        query = f"SELECT data FROM listings WHERE {where} ORDER BY {order} IS NULL, {order}"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    for (data,) in store.conn.execute(query, params):
+        yield json.loads(data)
+
+
+def count(store, match=None, **filters):
+    where, params = build_where(**filters)
+    if match:
+        query = f"""
+            SELECT COUNT(*) FROM listings_fts JOIN listings ON listings.rowid = listings_fts.rowid
+            WHERE listings_fts MATCH ? AND {where}
+        """
+        return store.conn.execute(query, [match, *params]).fetchone()[0]
+    return store.conn.execute(f"SELECT COUNT(*) FROM listings WHERE {where}", params).fetchone()[0]
+
+
+def stats(store, by, match=None, **filters):
+    # Per-group count and medians, from the typed columns only (no JSON decoded)
+    where, params = build_where(**filters)
+    if match:
+        where = f"rowid IN (SELECT rowid FROM listings_fts WHERE listings_fts MATCH ?) AND {where}"
+        params = [match, *params]
+    df = store.batch(where, params).to_frame()
+    df["price_per_m2"] = df["price_max"] / df["land_size"].where(df["land_size"] > 0)
+    grouped = df.groupby(by, observed=True).agg(
+        listings=("listing_id", "size"),
+        median_price=("price_max", "median"),
+        median_land_size=("land_size", "median"),
+        median_price_per_m2=("price_per_m2", "median"),
+    )
+    return grouped.sort_values("listings", ascending=False)
+
+
+def add_arguments(parser):
+    parser.add_argument("--suburb", nargs="+", dest="suburbs")
+    parser.add_argument("--postcode", type=parse_range, dest="postcodes", help="e.g. 2000-2150")
+    parser.add_argument("--zoning", nargs="+", help="zoning codes, e.g. B4 MU1")
+    parser.add_argument("--status", nargs="+", help='e.g. "On Market" Sold')
+    parser.add_argument("--price-min", type=parse_amount, help="e.g. 1.5m")
+    parser.add_argument("--price-max", type=parse_amount, help="e.g. 5m")
+    parser.add_argument("--land-min", type=float, help="m²")
+    parser.add_argument("--land-max", type=float, help="m²")
+    parser.add_argument("--phrase", nargs="+", help='match any of these phrases, e.g. "DA approved"')
+    parser.add_argument("--text", help='raw FTS5 query, e.g. \'"vacant possession" AND warehouse\'')
+    parser.add_argument("--order", default="price_max", choices=["price_max", "land_size", "postcode", "suburb"])
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--stats", choices=STATS_BY, help="count and median price/land size per group instead")
+    parser.add_argument("--output", help="write the full rows (or --stats) to a .csv or .xlsx file instead")
+    parser.add_argument("--store", default=STORE_FILE)
+
+
+FILTERS = ["suburbs", "postcodes", "zoning", "status", "price_min", "price_max", "land_min", "land_max"]
+
+
+def run(args):
+    store = ListingStore(args.store)
+    refresh_stats(store)
+    filters = {name: getattr(args, name) for name in FILTERS}
+    if args.text or args.phrase:
+        if not store.has_fts:
+            raise SystemExit("This SQLite build has no FTS5 support")
+        filters["match"] = args.text or phrase_query(args.phrase)
+    if args.stats:
+        table = stats(store, args.stats, **filters)
+        if args.limit:
+            table = table.head(args.limit)
+        if args.output:
+            if args.output.endswith(".csv"):
+                table.to_csv(args.output)
+            else:
+                table.to_excel(args.output)
+            print(f"📄 Wrote {len(table)} groups to {args.output}")
+        else:
+            print(table.to_string(float_format=lambda v: f"{v:,.0f}"))
+        return
+
+    rows = search(store, limit=args.limit, order=args.order, **filters)
+    if args.output:
+        import pandas as pd
+
+        df = pd.DataFrame(list(rows))
+        if args.output.endswith(".csv"):
+            df.to_csv(args.output, index=False)
+        else:
+            df.to_excel(args.output, index=False)
+        print(f"📄 Wrote {len(df)} listings to {args.output}")
+        return
+
+    shown = 0
+    for row in rows:
+        print(" | ".join(str(row.get(c, "")) for c in COLUMNS))
+        shown += 1
+    print(f"🔎 {shown} of {count(store, **filters)} matching listings")
@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class AdaptiveRateLimiter:
+    # Token bucket shared by every worker thread. The refill rate creeps up
+    # while the API answers normally and is halved on 429 / 5xx responses.
+    def __init__(self, rate=0.5, min_rate=0.1, max_rate=4.0, burst=1, step=0.05):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.step = step
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            # Drain the bucket so every worker pauses, for at least Retry-After if given
+            self.tokens = min(self.tokens, 0)
+            if retry_after:
+                self.tokens = -retry_after * self.rate
+
+    def report(self, status_code, retry_after=None):
+        if status_code == 429 or status_code >= 500:
+            # Retry-After may also be an HTTP date; only the seconds form is honoured
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            self.on_throttle(retry_after)
+            print(f"🐢 Throttled ({status_code}), rate now {self.rate:.2f} req/s")
+        else:
+            self.on_success()
@@ -0,0 +1,136 @@
+import math
+import re
+from array import array
+from dataclasses import dataclass
+
+# "$1,250,000", "$1.2m - $1.5m", "Offers over $850k"; the multiplier is optional
+AMOUNT_PATTERN = re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)\s*(k|m|mil(?:lion)?|b)?\b", re.IGNORECASE)
+# Rents and rates ("$450/m²", "$95,000 p.a.") aren't asking prices
+RATE_PATTERN = re.compile(r"(/|\bper\b|\bp\.?a\b|\bpw\b|\bsqm\b)", re.IGNORECASE)
+MULTIPLIERS = {"k": 1e3, "m": 1e6, "mil": 1e6, "million": 1e6, "b": 1e9}
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+MISSING = math.nan
+
+
+def normalize_value(value):
+    # Cell text as exported: None/NaN -> "", 2127.0 -> "2127"
+    if value is None or value != value:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_price(text):
+    # (min, max) in dollars; a single amount gives min == max. Blank Excel
+    # cells come back as NaN, which is no price either
+    if not isinstance(text, str) or not text or RATE_PATTERN.search(text):
+        return None, None
+    values = []
+    for amount, unit in AMOUNT_PATTERN.findall(text.replace("\u00a0", " ")):
+        value = float(amount.replace(",", ""))
+        values.append(value * MULTIPLIERS.get(unit.lower(), 1) if unit else value)
+    if not values:
+        return None, None
+    return min(values), max(values)
+
+
+def parse_area(text):
+    match = NUMBER_PATTERN.search(str(text or ""))
+    return float(match.group()) if match else None
+
+
+def parse_postcode(text):
+    match = re.fullmatch(r"\s*(\d{4})(?:\.0)?\s*", str(text or ""))
+    return int(match.group(1)) if match else None
+
+
+@dataclass(slots=True)
+class ListingRecord:
+    # Typed view of one stored detail row
+    listing_id: int
+    suburb: str
+    postcode: int | None
+    status: str
+    zoning: str
+    price_min: float | None
+    price_max: float | None
+    land_size: float | None
+    floor_area: float | None
+
+    @classmethod
+    def from_row(cls, listing_id, row):
+        price_min, price_max = parse_price(row.get("Asking Price"))
+        return cls(
+            listing_id=int(listing_id),
+            suburb=normalize_value(row.get("Suburb")),
+            postcode=parse_postcode(row.get("Postcode")),
+            status=normalize_value(row.get("Status")),
+            zoning=normalize_value(row.get("Zoning")),
+            price_min=price_min,
+            price_max=price_max,
+            land_size=parse_area(row.get("Land size")),
+            floor_area=parse_area(row.get("Floor area")),
+        )
+
+
+class Categories:
+    # Text column as small integer codes into a shared list of values
+    def __init__(self):
+        self.values = []
+        self.codes = array("H")
+        self.lookup = {}
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+
+class ListingBatch:
+    # Struct-of-arrays buffer of ListingRecords: one typed array per field,
+    # missing numbers as NaN (postcode 0), text fields dictionary-coded
+    NUMERIC_FIELDS = ["price_min", "price_max", "land_size", "floor_area"]
+    CATEGORY_FIELDS = ["suburb", "status", "zoning"]
+
+    def __init__(self):
+        self.listing_id = array("q")
+        self.postcode = array("H")
+        self.numeric = {f: array("d") for f in self.NUMERIC_FIELDS}
+        self.categories = {f: Categories() for f in self.CATEGORY_FIELDS}
+
+    def __len__(self):
+        return len(self.listing_id)
+
+    def append(self, record):
+        self.listing_id.append(record.listing_id)
+        self.postcode.append(record.postcode or 0)
+        for f, values in self.numeric.items():
+            value = getattr(record, f)
+            values.append(MISSING if value is None else value)
+        for f, column in self.categories.items():
+            column.append(getattr(record, f))
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+        return self
+
+    def to_frame(self):
+        # numpy views over the arrays; categoricals built straight from the codes
+        import numpy as np
+        import pandas as pd
+
+        data = {
+            "listing_id": np.frombuffer(self.listing_id, dtype=np.int64),
+            "postcode": pd.array(np.frombuffer(self.postcode, dtype=np.uint16), dtype="UInt16"),
+        }
+        data["postcode"][data["postcode"] == 0] = pd.NA
+        for f, values in self.numeric.items():
+            data[f] = np.frombuffer(values, dtype=np.float64)
+        for f, column in self.categories.items():
+            codes = np.frombuffer(column.codes, dtype=np.uint16).astype(np.int32)
+            data[f] = pd.Categorical.from_codes(codes, categories=column.values)
+        return pd.DataFrame(data)
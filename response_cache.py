@@ -0,0 +1,91 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+CACHE_FILE = "responses.db"
+TTL = 7 * 24 * 3600
+MAX_BYTES = 512 * 1024 * 1024
+
+
+def cache_key(method, path, body=None):
+    raw = json.dumps([method, path, body], sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    # Raw API responses as zlib-compressed JSON, addressed by a hash of the
+    # request. Entries older than the TTL are not served to live fetches but are
+    # kept for offline reparses; only the least recently used ones are evicted,
+    # once the cache outgrows MAX_BYTES.
+    def __init__(self, path=CACHE_FILE, ttl=TTL, max_bytes=MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                kind        TEXT NOT NULL,
+                ref         TEXT,
+                body        BLOB NOT NULL,
+                size        INTEGER NOT NULL,
+                fetched_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_kind_ref ON responses (kind, ref);
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+        """)
+        self.conn.commit()
+
+    def get(self, key, max_age=None):
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body FROM responses WHERE key = ? AND fetched_at >= ?", (key, now - max_age)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, kind, ref, payload):
+        body = zlib.compress(json.dumps(payload).encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, str(ref), body, len(body), now, now),
+            )
+            self.conn.commit()
+
+    def iter_kind(self, kind):
+        # Every cached payload of one kind, newest fetch per ref, ignoring the TTL
+        query = """
+            SELECT ref, body FROM responses r
+            WHERE kind = ? AND fetched_at = (SELECT MAX(fetched_at) FROM responses WHERE kind = r.kind AND ref = r.ref)
+        """
+        with self.lock:
+            rows = self.conn.execute(query, (kind,)).fetchall()
+        for ref, body in rows:
+            yield ref, json.loads(zlib.decompress(body))
+
+    def evict(self):
+        with self.lock, self.conn:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            evicted = 0
+            if total > self.max_bytes:
+                for key, size in self.conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at"
+                ).fetchall():
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    evicted += 1
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+        return evicted
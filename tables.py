@@ -0,0 +1,166 @@
+import os
+from importlib.util import find_spec
+
+# Checked without importing: pandas and pyarrow only load once a table is read or written
+HAS_PARQUET = find_spec("pyarrow") is not None
+
+# Low-cardinality text columns, stored dictionary-encoded and loaded as categoricals
+DICTIONARY_COLUMNS = ["Suburb", "Zoning", "Agency", "Status", "Tenure", "Property Types"]
+
+# Streaming export: rows are written EXPORT_CHUNK at a time, and the workbook
+# moves on to a new sheet once one is full
+EXPORT_CHUNK = 5000
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_CHARS = 32767
+# Kept as text in the store, written to Excel as numbers
+NUMERIC_COLUMNS = ["Land size", "Floor area"]
+
+
+def parquet_path(xlsx_path):
+    return os.path.splitext(xlsx_path)[0] + ".parquet"
+
+
+def read_table(xlsx_path):
+    # Prefer the Parquet copy (memory-mapped) unless the workbook was edited since
+    import pandas as pd
+
+    pq_path = parquet_path(xlsx_path)
+    if HAS_PARQUET and os.path.exists(pq_path):
+        if not os.path.exists(xlsx_path) or os.path.getmtime(pq_path) >= os.path.getmtime(xlsx_path):
+            return pd.read_parquet(pq_path, memory_map=True)
+    return pd.read_excel(xlsx_path)
+
+
+def text_value(v):
+    if v is None or v != v or isinstance(v, str):
+        return v
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return str(v)
+
+
+def uniform_text(series):
+    # Rows imported from Excel mix numbers and strings in one column; Arrow won't
+    return series.map(text_value)
+
+
+def write_table(df, xlsx_path, excel=True):
+    if not HAS_PARQUET and not excel:
+        print("⚠️ pyarrow not installed, writing Excel instead of Parquet")
+        excel = True
+    # Excel first, so the Parquet copy is never older than the workbook
+    if excel:
+        df.to_excel(xlsx_path, index=False)
+    if HAS_PARQUET:
+        df = df.apply(lambda s: uniform_text(s) if s.dtype == object else s)
+        dictionary = [c for c in DICTIONARY_COLUMNS if c in df.columns]
+        df = df.astype({c: "category" for c in dictionary})
+        df.to_parquet(parquet_path(xlsx_path), index=False, use_dictionary=dictionary or False)
+
+
+def excel_value(v, numeric=False):
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    if v is None or v != v or v == "":
+        return None
+    if numeric and isinstance(v, str):
+        try:
+            return float(v)
+        except ValueError:
+            pass
+    if isinstance(v, (int, float, bool)):
+        return v
+    # Control characters in descriptions make openpyxl refuse the whole row
+    return ILLEGAL_CHARACTERS_RE.sub("", str(v))[:EXCEL_MAX_CHARS]
+
+
+class ExcelStream:
+    # openpyxl write-only workbook: rows go straight to disk as they are added
+    def __init__(self, path, columns):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.columns = columns
+        self.numeric = [c in NUMERIC_COLUMNS for c in columns]
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheets = 0
+        self.rows = 0
+
+    def _new_sheet(self):
+        self.sheets += 1
+        self.sheet = self.workbook.create_sheet(f"Sheet{self.sheets}")
+        self.sheet.append(self.columns)
+        self.rows = 1
+
+    def write(self, rows):
+        for row in rows:
+            if self.sheet is None or self.rows >= EXCEL_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append([excel_value(row.get(c), n) for c, n in zip(self.columns, self.numeric)])
+            self.rows += 1
+
+    def close(self):
+        if self.sheet is None:
+            self._new_sheet()
+        self.workbook.save(self.path)
+
+
+class ParquetStream:
+    # One row group per chunk; every column is text, dictionary-encoded where low-cardinality
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.columns = columns
+        self.dictionary = [c for c in columns if c in DICTIONARY_COLUMNS]
+        self.schema = pa.schema([
+            pa.field(c, pa.dictionary(pa.int32(), pa.string()) if c in self.dictionary else pa.string())
+            for c in columns
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, use_dictionary=self.dictionary or False)
+
+    def write(self, rows):
+        import pyarrow as pa
+
+        arrays = []
+        for c in self.columns:
+            array = pa.array([None if r.get(c) is None else text_value(r.get(c)) for r in rows], pa.string())
+            arrays.append(array.dictionary_encode() if c in self.dictionary else array)
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def stream_table(rows, columns, xlsx_path, excel=True):
+    # Like write_table, for row dicts that don't fit in one DataFrame. Files are
+    # written under a temporary name and swapped in once complete.
+    if not HAS_PARQUET and not excel:
+        print("⚠️ pyarrow not installed, writing Excel instead of Parquet")
+        excel = True
+    targets = []
+    if excel:
+        targets.append((xlsx_path, ExcelStream))
+    if HAS_PARQUET:
+        targets.append((parquet_path(xlsx_path), ParquetStream))
+    writers = [(path, make(path + ".tmp", columns)) for path, make in targets]
+
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append({c: (None if v != v else v) for c, v in row.items()})
+        if len(chunk) >= EXPORT_CHUNK:
+            for _, writer in writers:
+                writer.write(chunk)
+            count += len(chunk)
+            chunk = []
+    for _, writer in writers:
+        writer.write(chunk)
+        writer.close()
+    count += len(chunk)
+
+    # Excel first, so the Parquet copy is never older than the workbook
+    for path, _ in writers:
+        os.replace(path + ".tmp", path)
+    return count
@@ -0,0 +1,122 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = "metrics.prom"
+# Histogram buckets in seconds, from a fast cache hit to a slow workbook write
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+_lock = threading.Lock()
+_counters = {}
+# Per timing: observations per bucket (the last one past BUCKETS[-1]), sum, count
+_timings = {}
+_started = time.monotonic()
+
+
+def _key(name, labels):
+    # Label values as text, so 200 and "ConnectionError" sort together
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    bucket = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        timing = _timings.setdefault(key, [[0] * (len(BUCKETS) + 1), 0.0, 0])
+        timing[0][bucket] += 1
+        timing[1] += seconds
+        timing[2] += 1
+
+
+@contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def totals():
+    # Counter values and summed timings per metric name, across labels
+    out = {}
+    with _lock:
+        for (name, _), value in _counters.items():
+            out[name] = out.get(name, 0) + value
+        for (name, _), (_, total, _) in _timings.items():
+            out[name] = out.get(name, 0) + total
+    return out
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _quantile(buckets, count, q):
+    # Interpolated within the bucket, like Prometheus' histogram_quantile();
+    # past the last bucket only its bound is known
+    rank = q * count
+    seen = 0
+    for i, n in enumerate(buckets):
+        if n and seen + n >= rank:
+            if i == len(BUCKETS):
+                return BUCKETS[-1]
+            lower = BUCKETS[i - 1] if i else 0
+            return lower + (BUCKETS[i] - lower) * (rank - seen) / n
+        seen += n
+    return BUCKETS[-1]
+
+
+def summary():
+    elapsed = time.monotonic() - _started
+    lines = [f"⏱️ Run time {elapsed:.1f}s"]
+    with _lock:
+        for (name, labels), (buckets, total, count) in sorted(_timings.items()):
+            lines.append(
+                f"  {name}{_label_text(labels)}: n={count} total={total:.2f}s "
+                f"p50={_quantile(buckets, count, 0.5) * 1000:.0f}ms p99={_quantile(buckets, count, 0.99) * 1000:.0f}ms"
+            )
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(f"  {name}{_label_text(labels)}: {value}")
+        rows = sum(v for (name, _), v in _counters.items() if name == "rows_saved_total")
+        responses = sum(v for (name, _), v in _counters.items() if name == "http_responses_total")
+        retries = sum(v for (name, _), v in _counters.items() if name == "http_retries_total")
+    if responses:
+        lines.append(f"  retry rate: {retries / responses:.1%}")
+    if rows and elapsed:
+        lines.append(f"  rows/min: {rows / elapsed * 60:.1f}")
+    return "\n".join(lines)
+
+
+def write_prometheus(path=METRICS_FILE):
+    # Prometheus text exposition format, e.g. for node_exporter's textfile collector
+    out = []
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            out.append(f"{name}{_label_text(labels)} {value}")
+        for (name, labels), (buckets, total, count) in sorted(_timings.items()):
+            le = 0
+            for bound, n in zip(BUCKETS, buckets):
+                le += n
+                out.append(f"{name}_bucket{_label_text(labels, [('le', bound)])} {le}")
+            out.append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {count}")
+            out.append(f"{name}_sum{_label_text(labels)} {total}")
+            out.append(f"{name}_count{_label_text(labels)} {count}")
+    with open(path, "w") as f:
+        f.write("\n".join(out) + "\n")
+
+
+def report(path=METRICS_FILE):
+    print(summary())
+    write_prometheus(path)
+    print(f"📈 Metrics written to {path}")
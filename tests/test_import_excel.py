@@ -0,0 +1,33 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from listing_store import ListingStore, extract_listing_id
+from records import ListingRecord, parse_price
+
+
+def test_blank_cells_have_no_price():
+    assert parse_price(float("nan")) == (None, None)
+    assert parse_price(None) == (None, None)
+    assert parse_price("$1.2m - $1.5m") == (1.2e6, 1.5e6)
+
+
+def test_blank_text_cells_stay_blank():
+    record = ListingRecord.from_row("1", {"Suburb": float("nan"), "Status": None, "Zoning": float("nan")})
+    assert (record.suburb, record.status, record.zoning) == ("", "", "")
+
+
+def test_import_shipped_workbook(tmp_path):
+    # Most of its rows have a blank "Asking Price", read back as NaN
+    path = str(tmp_path / "listings.db")
+    imported = ListingStore(path).import_excel(os.path.join(ROOT, "detailed_listings.xlsx"), extract_listing_id)
+    assert imported > 0
+
+    # Opening the store again backfills typed columns; it must not fail either
+    store = ListingStore(path)
+    assert len(store) == imported
+    assert store.conn.execute("SELECT COUNT(*) FROM listings WHERE suburb IS NULL").fetchone()[0] == 0
+    assert store.conn.execute("SELECT COUNT(*) FROM listings WHERE suburb = 'nan'").fetchone()[0] == 0
+    assert store.conn.execute("SELECT COUNT(*) FROM listings WHERE price_max IS NOT NULL").fetchone()[0] > 0
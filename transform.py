@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pandas as pd
+
+from listing_store import DETAIL_COLUMNS
+from zoning import extract_zoning_shortcode
+
+SITE_URL = "https://www.realcommercial.com.au"
+
+
+def column(df, name, default=""):
+    # json_normalize only creates columns for keys that appear in the batch
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index, dtype=object)
+
+
+def text(series):
+    return series.fillna("").astype(str)
+
+
+# Nested list/dict access. The .str accessor refuses columns that happen to
+# be all-missing in a batch (e.g. no listing has a second agent), so these map.
+def nth(series, i):
+    return series.map(lambda v: v[i] if isinstance(v, list) and len(v) > i else None)
+
+
+def get(series, key):
+    return series.map(lambda v: v.get(key) if isinstance(v, dict) else None)
+
+
+def attribute_table(attributes):
+    # [{"id": "land-area", "value": "450 m²"}, ...] per listing -> one column per id
+    exploded = attributes.explode().dropna()
+    exploded = exploded[exploded.map(lambda a: isinstance(a, dict))]
+    if exploded.empty:
+        return pd.DataFrame(index=attributes.index)
+    pairs = pd.DataFrame(exploded.tolist(), index=exploded.index)
+    pairs["row"] = exploded.index
+    # Same as building a dict per listing: the last value for an id wins
+    pairs = pairs.drop_duplicates(subset=["row", "id"], keep="last")
+    return pairs.pivot(index="row", columns="id", values="value").reindex(attributes.index)
+
+
+def normalize_listings(listings, now=None):
+    # Batch transform of raw "listing" payloads into detail rows, one row per
+    # payload in input order. Mirrors the old per-record parsing in
+    # main_details.fetch_details using column-wise pandas operations.
+    now = now or datetime.now()
+    df = pd.json_normalize(listings)
+    if df.empty:
+        return pd.DataFrame(columns=DETAIL_COLUMNS)
+
+    attrs = attribute_table(column(df, "attributes", None))
+
+    channels = column(df, "availableChannels", None).explode()
+    sold = text(channels).str.lower().eq("sold").groupby(level=0).any().reindex(df.index, fill_value=False)
+    status = sold.map({True: "Sold", False: "On Market"})
+
+    price = text(column(df, "price.forSale.display"))
+    asking_price = price.where(status.eq("On Market") & price.str.contains("$", regex=False), "")
+
+    days_active = pd.to_numeric(column(df, "daysActive", 0), errors="coerce").fillna(0)
+    date_added = (pd.Timestamp(now) - pd.to_timedelta(days_active, unit="D")).dt.strftime("%Y-%m-%d")
+
+    # Postcode: first 4-digit number after the last comma ('Ryde, NSW 2112' -> '2112')
+    postcode = text(column(df, "address.suburbAddress")).str.extract(r",[^,]*?\b(\d{4})\b[^,]*$")[0]
+
+    agency = nth(column(df, "agencies", None), 0)
+    salespeople = get(agency, "salespeople")
+    property_types = column(df, "propertyTypes", None).map(lambda v: " • ".join(v) if isinstance(v, list) else "")
+
+    out = pd.DataFrame({
+        "Listing URL": SITE_URL + text(column(df, "canonicalPath")),
+        "Street name": text(column(df, "address.streetAddress")),
+        "Suburb": text(column(df, "address.suburb")),
+        "Postcode": text(postcode),
+        "Property Types": property_types,
+        "Status": status,
+        "Asking Price": asking_price,
+        "Land size": text(column(attrs, "land-area")).str.replace(r"[^\d.]", "", regex=True),
+        "Floor area": text(column(attrs, "floor-area")).str.replace(r"[^\d.]", "", regex=True),
+        "Zoning": text(column(attrs, "zoning")).map(extract_zoning_shortcode),
+        "Tenure": text(column(attrs, "tenure-type")),
+        "Date Added": date_added,
+        "Agency": text(get(agency, "name")),
+        "Agent name 1": text(get(nth(salespeople, 0), "name")),
+        "Agent name 2": text(get(nth(salespeople, 1), "name")),
+        "Title": text(column(df, "title")),
+        "Description": text(column(df, "description")),
+    })
+    return out[DETAIL_COLUMNS]
@@ -0,0 +1,98 @@
+import json
+import sqlite3
+import threading
+import time
+
+from listing_store import STORE_FILE
+
+LEASE_SECONDS = 300
+# A batch whose lease ran out this many times (its worker kept dying) is
+# set aside as 'failed' instead of being handed out again
+MAX_CLAIMS = 3
+
+
+class WorkQueue:
+    # Listing IDs shared by detail worker processes. A worker claims a batch
+    # under a lease and acks it once the rows are stored; a batch whose lease
+    # runs out (worker killed) is handed to the next claimer. Claims take
+    # SQLite's write lock, so no two live leases ever cover the same ID.
+    def __init__(self, path=STORE_FILE):
+        self.lock = threading.Lock()
+        # Workers in other processes hold the write lock briefly; wait for it
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS work_queue (
+                listing_id    TEXT PRIMARY KEY,
+                extra         TEXT NOT NULL,
+                state         TEXT NOT NULL DEFAULT 'pending',
+                owner         TEXT,
+                lease_expires REAL,
+                attempts      INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS work_queue_state ON work_queue (state, lease_expires);
+        """)
+        self.conn.commit()
+
+    def enqueue(self, items):
+        # items: (listing_id, extra columns); IDs already queued are left alone
+        with self.lock, self.conn:
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO work_queue (listing_id, extra) VALUES (?, ?)",
+                [(str(listing_id), json.dumps(extra, default=str)) for listing_id, extra in items],
+            )
+        return cursor.rowcount
+
+    def claim(self, owner, limit, lease=LEASE_SECONDS):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "UPDATE work_queue SET state = 'failed', lease_expires = NULL "
+                    "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, MAX_CLAIMS),
+                )
+                rows = self.conn.execute(
+                    """
+                    SELECT listing_id, extra FROM work_queue
+                    WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)
+                    ORDER BY rowid LIMIT ?
+                    """,
+                    (now, limit),
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE work_queue SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE listing_id = ?",
+                    [(owner, now + lease, listing_id) for listing_id, _ in rows],
+                )
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        return [(listing_id, json.loads(extra)) for listing_id, extra in rows]
+
+    def renew(self, owner, lease=LEASE_SECONDS):
+        # Extend every lease this owner still holds; called while a batch is in progress
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE work_queue SET lease_expires = ? WHERE owner = ? AND state = 'leased'",
+                (time.time() + lease, owner),
+            )
+
+    def ack(self, owner, listing_ids):
+        # Only the current lease holder can complete an item
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE work_queue SET state = 'done', lease_expires = NULL WHERE listing_id = ? AND owner = ?",
+                [(str(listing_id), owner) for listing_id in listing_ids],
+            )
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM work_queue GROUP BY state").fetchall()
+        return dict(rows)
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM work_queue")
@@ -0,0 +1,76 @@
+import re
+from functools import lru_cache
+
+ZONING_MAP = {
+    "Neighbourhood Centre": "B1",
+    "Local Centre": "B2",
+    "Commercial Core": "B3",
+    "Mixed Use": "B4",
+    "Business Development": "B5",
+    "Enterprise Corridor": "B6",
+    "Business Park": "B7",
+    "Metropolitan Centre": "B8",
+    "National Parks and Nature Reserves": "E1",
+    "Environmental Conservation": "E2",
+    "Environmental Management": "E3",
+    "Environmental Living": "E4",
+    "General Industrial": "IN1",
+    "Light Industrial": "IN2",
+    "Heavy Industrial": "IN3",
+    "Working Waterfront": "IN4",
+    "General Residential": "R1",
+    "Low Density Residential": "R2",
+    "Medium Density Residential": "R3",
+    "High Density Residential": "R4",
+    "Large Lot Residential": "R5",
+    "Public Recreation": "RE1",
+    "Private Recreation": "RE2",
+    "Primary Production": "RU1",
+    "Rural Landscape": "RU2",
+    "Forestry": "RU3",
+    "Primary Production Small Lots": "RU4",
+    "Village": "RU5",
+    "Transition": "RU6",
+    "Special Activities": "SP1",
+    "Infrastructure": "SP2",
+    "Tourist": "SP3",
+    "Natural Waterways": "W1",
+    "Recreational Waterways": "W2",
+    "Working Waterways": "W3",
+    # Names introduced by the 2023 NSW employment zones reform
+    "Commercial Centre": "E2",
+    "Productivity Support": "E3",
+    "Enterprise": "SP4"
+}
+
+# Codes that are returned verbatim when the text carries them. Renamed zones
+# ("Mixed Use", "Local Centre", "General Industrial", ...) share their long
+# names between the old and reformed schemes, so only the explicit code tells
+# MU1 from B4 or E4 from IN1.
+ZONING_CODES = set(ZONING_MAP.values()) | {
+    "C1", "C2", "C3", "C4",
+    "E1", "E2", "E3", "E4", "E5",
+    "MU1", "SP4", "SP5", "W4",
+}
+
+# Compiled once; longest first so "Primary Production Small Lots" beats "Primary Production"
+CODE_PATTERN = re.compile(r"\b(" + "|".join(sorted(ZONING_CODES, key=len, reverse=True)) + r")\b")
+NAME_PATTERN = re.compile(
+    "|".join(re.escape(name) for name in sorted(ZONING_MAP, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+NAME_TO_CODE = {name.lower(): code for name, code in ZONING_MAP.items()}
+FALLBACK_PATTERN = re.compile(r"\b([A-Z]{1,3}\d{0,2})\b")
+
+
+@lru_cache(maxsize=4096)
+def extract_zoning_shortcode(zoning_raw):
+    code_match = CODE_PATTERN.search(zoning_raw)
+    if code_match:
+        return code_match.group(1)
+    name_match = NAME_PATTERN.search(zoning_raw)
+    if name_match:
+        return NAME_TO_CODE[name_match.group(0).lower()]
+    # fallback regex if backend sends some other short code
+    zoning_match = FALLBACK_PATTERN.search(zoning_raw)
+    return zoning_match.group(1) if zoning_match else zoning_raw